@@ -2,10 +2,10 @@ import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 import streamlit as st
-from rag_engine.rag_engine import initialize_rag_pipeline, process_query
-from rag_engine.pdf_qa import PDFContextRetriever
+from rag_engine.rag_engine import initialize_rag_pipeline, stream_query
+from rag_engine.pdf_registry import PDFRetrieverRegistry
+from rag_engine.startup import warm_up
 import tempfile
-import time
 from datetime import datetime
 
 # Page configuration
@@ -91,6 +91,13 @@ st.markdown("""
 st.markdown('<h1 class="main-header">📰📄 FactSift</h1>', unsafe_allow_html=True)
 st.markdown('<p class="subtitle">Your AI-powered fact-checking and document analysis assistant</p>', unsafe_allow_html=True)
 
+# Extractors load lazily; pull them in once per server process while the first user is typing
+@st.cache_resource
+def warm_up_dependencies():
+    return warm_up(("extractors",), background=True)
+
+warm_up_dependencies()
+
 # Initialize session state
 def initialize_session_state():
     if "chat_history" not in st.session_state:
@@ -105,17 +112,24 @@ def initialize_session_state():
 
 initialize_session_state()
 
+# One registry per server process, shared by all sessions
+@st.cache_resource
+def get_pdf_registry():
+    return PDFRetrieverRegistry()
+
 # Sidebar with information
 with st.sidebar:
     st.markdown("### 📊 Chat Statistics")
     # Safe counting with error handling
-    news_queries = len([msg for msg in st.session_state.chat_history if isinstance(msg, (list, tuple)) and len(msg) >= 2 and msg[0] == "user"])
-    pdf_queries = len([msg for msg in st.session_state.pdf_history if isinstance(msg, (list, tuple)) and len(msg) >= 2 and msg[0] == "user"])
+    news_queries = len([msg for msg in st.session_state.chat_history if isinstance(msg, dict) and msg.get("role") == "user"])
+    pdf_queries = len([msg for msg in st.session_state.pdf_history if isinstance(msg, dict) and msg.get("role") == "user"])
     
     st.metric("News Queries", news_queries)
     st.metric("PDF Questions", pdf_queries)
     
     st.markdown("### 🔧 Controls")
+    st.checkbox("🔄 Bypass cache", key="force_refresh",
+                help="Search and scrape again instead of reusing recent results")
     if st.button("🗑️ Clear News Chat", use_container_width=True):
         st.session_state.chat_history = []
         st.rerun()
@@ -134,6 +148,18 @@ with st.sidebar:
     about its content.
     """)
 
+def describe_stage(event):
+    stage = event["stage"]
+    if stage == "searched":
+        return f"🔍 Found {event['total']} articles"
+    if stage == "fetched":
+        return f"📰 Fetched {event['done']}/{event['total']} articles"
+    if stage == "indexed":
+        return f"🧩 Indexed {event['chunks']} passages from {event['documents']} articles"
+    if stage == "retrieved":
+        return f"🎯 Selected {event['chunks']} most relevant passages"
+    return stage
+
 # Main tabs
 tab1, tab2 = st.tabs(["🗞️ News Chat", "📄 PDF Analysis"])
 
@@ -146,13 +172,9 @@ with tab1:
     if st.session_state.chat_history:
         st.markdown('<div class="chat-container">', unsafe_allow_html=True)
         for msg in st.session_state.chat_history:
-            # Ensure message is in correct format
-            if isinstance(msg, (list, tuple)) and len(msg) >= 2:
-                role, message = msg[0], msg[1]
-                if role == "user":
-                    st.chat_message("user").write(message)
-                elif role == "bot" or role == "assistant":
-                    st.chat_message("assistant").write(message)
+            # History holds {"role", "content"} dicts, the same ones sent to the LLM
+            if isinstance(msg, dict) and msg.get("role") in ("user", "assistant"):
+                st.chat_message(msg["role"]).write(msg["content"])
         st.markdown('</div>', unsafe_allow_html=True)
     else:
         st.info("👋 Welcome! Ask me anything about current news and events. I'll search for the latest information to give you accurate, up-to-date answers.")
@@ -182,29 +204,44 @@ with tab1:
     
     # Process query
     if query:
-        # Add user message immediately
-        st.session_state.chat_history.append(("user", query))
+        # Show the question immediately; stream_query appends both turns to the history
+        st.chat_message("user").write(query)
         
         try:
-            with st.spinner("🔍 Searching for latest information..."):
-                progress_bar = st.progress(0)
-                for i in range(100):
-                    time.sleep(0.01)
-                    progress_bar.progress(i + 1)
-                
-                response = process_query(query, st.session_state.pipeline, st.session_state.chat_history)
-                
-                # Fix the duplicate entries issue
+            status = st.status("🔍 Searching for latest information...")
+            answer_box = st.chat_message("assistant").empty()
+            answer = ""
+            response = {}
+
+            # Render pipeline progress and answer tokens as they arrive
+            for event in stream_query(query, st.session_state.pipeline, st.session_state.chat_history,
+                                      force_refresh=st.session_state.get("force_refresh", False)):
+                if event["type"] == "stage":
+                    label = describe_stage(event)
+                    status.update(label=label)
+                    status.write(label)
+                elif event["type"] == "token":
+                    answer += event["text"]
+                    answer_box.markdown(answer + "▌")
+                elif event["type"] == "done":
+                    response = event
+            answer_box.markdown(answer)
+            status.update(label="✅ Answer ready" + (" (cached)" if response.get("cached") else ""), state="complete")
+            if response.get("trace"):
+                with status:
+                    counters = response["trace"].get("counters", {})
+                    prompt_tokens = int(counters.get("tokens.context", 0) + counters.get("tokens.history", 0))
+                    st.caption(f"⏱️ {response['trace']['total_seconds']:.1f}s total · ~{prompt_tokens} prompt tokens")
+                    st.json(response["trace"]["stages"], expanded=False)
+
+            if response:
                 st.session_state.chat_history = response.get("chat_history", st.session_state.chat_history)
-                st.session_state.chat_history.append(("bot", response["answer"]))
-                
-                progress_bar.empty()
-                
-                # Show sources if available
-                if "sources" in response and response["sources"]:
-                    st.markdown('<div class="source-info">📚 <strong>Sources:</strong><br>' + 
-                              '<br>'.join([f"• {source}" for source in response["sources"][:3]]) + 
-                              '</div>', unsafe_allow_html=True)
+
+            # Show sources if available
+            if "sources" in response and response["sources"]:
+                st.markdown('<div class="source-info">📚 <strong>Sources:</strong><br>' + 
+                          '<br>'.join([f"• {source}" for source in response["sources"][:3]]) + 
+                          '</div>', unsafe_allow_html=True)
                 
         except Exception as e:
             st.markdown(f'<div class="error-message">❌ <strong>Error:</strong> {str(e)}</div>', 
@@ -261,13 +298,8 @@ with tab2:
         st.markdown("### 💬 Document Q&A History")
         st.markdown('<div class="chat-container">', unsafe_allow_html=True)
         for msg in st.session_state.pdf_history:
-            # Ensure message is in correct format
-            if isinstance(msg, (list, tuple)) and len(msg) >= 2:
-                role, message = msg[0], msg[1]
-                if role == "user":
-                    st.chat_message("user").write(message)
-                elif role == "bot" or role == "assistant":
-                    st.chat_message("assistant").write(message)
+            if isinstance(msg, dict) and msg.get("role") in ("user", "assistant"):
+                st.chat_message(msg["role"]).write(msg["content"])
         st.markdown('</div>', unsafe_allow_html=True)
     
     # PDF Question Input
@@ -281,15 +313,15 @@ with tab2:
         
         if question_pdf:
             # Add question to history
-            st.session_state.pdf_history.append(("user", question_pdf))
+            st.session_state.pdf_history.append({"role": "user", "content": question_pdf})
             
             try:
                 with st.spinner("📖 Analyzing document..."):
                     progress_bar = st.progress(0)
                     
-                    # Initialize PDF retriever
+                    # Reuse the index if this document was already processed
                     progress_bar.progress(25)
-                    pdf_retriever = PDFContextRetriever(file_path=st.session_state.current_pdf["path"])
+                    pdf_retriever = get_pdf_registry().get(st.session_state.current_pdf["path"])
                     
                     # Retrieve context
                     progress_bar.progress(50)
@@ -301,7 +333,7 @@ with tab2:
                     progress_bar.progress(100)
                     
                     # Add answer to history
-                    st.session_state.pdf_history.append(("bot", pdf_answer))
+                    st.session_state.pdf_history.append({"role": "assistant", "content": pdf_answer})
                     
                     progress_bar.empty()
                     
@@ -0,0 +1,53 @@
+import hashlib
+import re
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.prompts import ChatPromptTemplate
+
+
+class HashingEmbeddings(Embeddings):
+    """Deterministic bag-of-words embeddings.
+
+    Each token is hashed into one of `size` buckets, so texts that share
+    words get similar vectors and retrieval results are meaningful, unlike
+    purely random fake embeddings.
+    """
+
+    def __init__(self, size: int = 3072):
+        self.size = size
+        self.calls = 0
+        self.texts = 0
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.size, dtype=np.float32)
+        for token in re.findall(r"\w+", text.lower()):
+            bucket = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+            vector[bucket % self.size] += 1.0
+        return vector.tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        self.texts += len(texts)
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+def fake_chat_model(answer: str = "This is a benchmark answer based on the provided context."):
+    """Chat model that always streams back the same answer."""
+    def messages():
+        while True:
+            yield AIMessage(content=answer)
+    return GenericFakeChatModel(messages=messages())
+
+
+def fake_prompt():
+    """Offline stand-in for the hub 'rlm/rag-prompt' template."""
+    return ChatPromptTemplate.from_messages([
+        ("human", "Question: {question}\nContext: {context}\nAnswer:"),
+    ])
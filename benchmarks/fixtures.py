@@ -0,0 +1,49 @@
+import os
+import re
+import tempfile
+
+from benchmarks.server import CORPUS_DIR, render_corpus
+
+
+def corpus_paragraphs():
+    """Paragraph text from the recorded HTML corpus."""
+    paragraphs = []
+    for name in sorted(os.listdir(CORPUS_DIR)):
+        if name.endswith(".html"):
+            with open(os.path.join(CORPUS_DIR, name), encoding="utf-8") as f:
+                html = render_corpus(f.read())
+            paragraphs += [re.sub(r"<[^>]+>", "", p) for p in re.findall(r"<p>(.*?)</p>", html, re.S)]
+    return paragraphs
+
+
+def build_pdfs(pages: int = 20, directory: str = None):
+    """Write a text PDF and a scanned (image-only) PDF with the same content.
+
+    PDFs are generated rather than checked in, so the corpus stays small
+    and the page count can be scaled. Returns (text_pdf_path, scanned_pdf_path).
+    """
+    import fitz
+
+    directory = directory or tempfile.mkdtemp(prefix="factsift-bench-")
+    paragraphs = corpus_paragraphs()
+    text_path = os.path.join(directory, "text.pdf")
+    scanned_path = os.path.join(directory, "scanned.pdf")
+
+    text_doc = fitz.open()
+    for i in range(pages):
+        page = text_doc.new_page()
+        body = "\n\n".join(paragraphs[(i + j) % len(paragraphs)] for j in range(4))
+        page.insert_textbox(fitz.Rect(50, 50, 545, 790), f"Page {i + 1}\n\n{body}", fontsize=10)
+    text_doc.save(text_path)
+
+    # Rasterize every page so the scanned copy has no text layer
+    scanned_doc = fitz.open()
+    for page in text_doc:
+        pix = page.get_pixmap(dpi=150)
+        new_page = scanned_doc.new_page(width=page.rect.width, height=page.rect.height)
+        new_page.insert_image(new_page.rect, pixmap=pix)
+    scanned_doc.save(scanned_path)
+
+    text_doc.close()
+    scanned_doc.close()
+    return text_path, scanned_path
@@ -0,0 +1,262 @@
+"""Offline benchmarks for the FactSift pipeline.
+
+Everything runs locally: article HTML is served from benchmarks/corpus by
+a local HTTP server, PDFs are generated from the same corpus, and the
+LLM, embeddings and hub prompt are replaced by deterministic fakes.
+
+    python -m benchmarks.run                    # run and print results
+    python -m benchmarks.run --save-baseline    # record results as the baseline
+    python -m benchmarks.run --check            # exit 1 if anything regressed
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from langchain_core.documents import Document
+
+from benchmarks.fakes import HashingEmbeddings, fake_chat_model, fake_prompt
+from benchmarks.fixtures import build_pdfs, corpus_paragraphs
+from benchmarks.server import CorpusServer, FakeEmbeddingServer
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+QUERIES = [
+    "Did the central bank change interest rates?",
+    "What happened to Treasury yields after the statement?",
+    "How cheap are lithium iron phosphate battery cells?",
+    "How much power do batteries supply in Texas?",
+    "What is the unemployment rate?",
+]
+
+
+def measure(fn, iterations: int, warmup: int = 1) -> dict:
+    """Time `fn` repeatedly. `fn` returns how many items it processed."""
+    for _ in range(warmup):
+        fn()
+    latencies, items = [], 0
+    for _ in range(iterations):
+        start = time.perf_counter()
+        items += fn() or 1
+        latencies.append(time.perf_counter() - start)
+    total = sum(latencies)
+    latencies.sort()
+    return {
+        "iterations": iterations,
+        "p50_ms": round(1000 * statistics.median(latencies), 3),
+        "p95_ms": round(1000 * latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))], 3),
+        "items_per_sec": round(items / total, 2) if total else None,
+    }
+
+
+def make_pipeline():
+    from rag_engine.dedup import NearDuplicateIndex
+    from rag_engine.query_cache import QueryCache
+    from rag_engine.rag_engine import RAGPipeline
+    return RAGPipeline(max_chunks=1_000_000, ttl_seconds=None, scope="session", cache=QueryCache(),
+                       llm=fake_chat_model(), embeddings=HashingEmbeddings(), prompt=fake_prompt(),
+                       dedup_index=NearDuplicateIndex())
+
+
+def synthetic_documents(count: int):
+    domains = ["reuters", "bbc", "examplenews", "hindustantimes", "ap", "dailyledger", "theverge"]
+    paragraphs = corpus_paragraphs()
+    now = datetime.utcnow()
+    docs = []
+    for i in range(count):
+        text = "\n\n".join(paragraphs[(i + j) % len(paragraphs)] for j in range(1 + i % 6))
+        docs.append(Document(page_content=text, metadata={
+            "source": f"https://www.{domains[i % len(domains)]}.com/article/{i}",
+            "domain": domains[i % len(domains)],
+            "publish_date": (now - timedelta(days=i % 15)).isoformat() if i % 5 else None,
+            "scraped_at": now.isoformat(),
+        }))
+    return docs
+
+
+def bench_cold_start(iterations):
+    """Fresh-interpreter import of the pipeline, i.e. a worker's time to ready."""
+    from rag_engine.startup import cold_import
+    runs = max(1, min(iterations, 5))
+    seconds = [cold_import("rag_engine.rag_engine", runs=1)["seconds"] for _ in range(runs)]
+    seconds.sort()
+    return {
+        "iterations": runs,
+        "p50_ms": round(1000 * statistics.median(seconds), 3),
+        "p95_ms": round(1000 * seconds[min(runs - 1, int(0.95 * runs))], 3),
+        "items_per_sec": round(runs / sum(seconds), 2),
+    }
+
+
+def bench_extraction(server, iterations):
+    from rag_engine.news_article import load_web_content_hybrid
+    urls = server.urls()
+
+    def run():
+        loaded = 0
+        for url in urls:
+            try:
+                load_web_content_hybrid(url)
+                loaded += 1
+            except Exception:
+                pass
+        return loaded
+    return measure(run, iterations)
+
+
+def bench_credibility(iterations):
+    from rag_engine.quality_filtering import credibility_scores
+    docs = synthetic_documents(2000)
+    return measure(lambda: len(credibility_scores(docs)) or 1, iterations)
+
+
+def bench_indexing(iterations):
+    pipeline = make_pipeline()
+    docs = synthetic_documents(200)
+    counter = iter(range(1_000_000))
+    return measure(lambda: pipeline.index_documents(docs, namespace=f"bench-{next(counter)}"), iterations)
+
+
+def bench_retrieval(iterations):
+    pipeline = make_pipeline()
+    pipeline.index_documents(synthetic_documents(500))
+
+    def run():
+        for query in QUERIES:
+            context = pipeline.retrieve_context(query, top_k=10)
+            pipeline.score_and_select_context(context)
+        return len(QUERIES)
+    return measure(run, iterations)
+
+
+def bench_pdf(path, iterations, ocr_workers=None):
+    from rag_engine.pdf_qa import PDFContextRetriever
+
+    def run():
+        retriever = PDFContextRetriever(file_path=path, llm=fake_chat_model(), embeddings=HashingEmbeddings(),
+                                        prompt=fake_prompt(), ocr_workers=ocr_workers)
+        for query in QUERIES:
+            retriever.generate(query, retriever.retrieve_context(query))
+        return 1
+    return measure(run, iterations, warmup=0)
+
+
+def bench_embedding_scheduler(iterations, sessions: int = 20, chunks: int = 20):
+    """Concurrent sessions embedding through one scheduler against a rate-limited fake API."""
+    from concurrent.futures import ThreadPoolExecutor
+    from rag_engine.embedding_scheduler import EmbeddingScheduler, ScheduledEmbeddings
+
+    with FakeEmbeddingServer(requests_per_second=20, latency=0.02) as server:
+        embeddings = ScheduledEmbeddings(EmbeddingScheduler(server.client(), requests_per_minute=None,
+                                                            tokens_per_minute=None))
+        counter = iter(range(1_000_000))
+
+        def run():
+            # Fresh texts every run, as the scheduler sits behind the embedding cache
+            run_id = next(counter)
+            texts = [[f"run {run_id} session {s} chunk {i}: {p}" for i, p in enumerate(corpus_paragraphs()[:chunks])]
+                     for s in range(sessions)]
+            with ThreadPoolExecutor(sessions) as pool:
+                return sum(len(vectors) for vectors in pool.map(embeddings.embed_documents, texts))
+        return measure(run, iterations)
+
+
+def run_benchmarks(iterations: int, pdf_pages: int, latency: float) -> dict:
+    results = {}
+
+    def record(name, fn, *args):
+        print(f"▶ {name}...", flush=True)
+        try:
+            results[name] = fn(*args)
+        except Exception as e:
+            # Missing optional tooling (e.g. the tesseract binary) skips a benchmark
+            results[name] = {"skipped": f"{type(e).__name__}: {e}"}
+
+    record("cold_start", bench_cold_start, iterations)
+    with CorpusServer(latency=latency) as server:
+        record("load_web_content_hybrid", bench_extraction, server, iterations)
+    record("credibility_scores", bench_credibility, iterations)
+    record("index_documents", bench_indexing, iterations)
+    record("retrieve_and_select", bench_retrieval, iterations)
+    record("embedding_scheduler", bench_embedding_scheduler, iterations)
+
+    try:
+        text_pdf, scanned_pdf = build_pdfs(pdf_pages)
+    except Exception as e:
+        results["pdf_text"] = results["pdf_scanned"] = {"skipped": f"{type(e).__name__}: {e}"}
+    else:
+        record("pdf_text", bench_pdf, text_pdf, max(1, iterations // 5))
+        record("pdf_scanned", bench_pdf, scanned_pdf, 1)
+    return results
+
+
+def find_regressions(results: dict, baseline: dict, threshold: float):
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous or "skipped" in current or "skipped" in previous:
+            continue
+        if previous.get("p50_ms") and current["p50_ms"] > previous["p50_ms"] * (1 + threshold):
+            regressions.append(f"{name}: p50 {previous['p50_ms']}ms -> {current['p50_ms']}ms")
+        if previous.get("items_per_sec") and current["items_per_sec"] < previous["items_per_sec"] * (1 - threshold):
+            regressions.append(f"{name}: throughput {previous['items_per_sec']}/s -> {current['items_per_sec']}/s")
+    return regressions
+
+
+def print_report(results: dict, baseline: dict):
+    print(f"\n{'benchmark':<26}{'p50 ms':>12}{'p95 ms':>12}{'items/s':>12}{'baseline p50':>15}")
+    for name, r in results.items():
+        if "skipped" in r:
+            print(f"{name:<26}  skipped ({r['skipped']})")
+            continue
+        base = baseline.get(name, {}).get("p50_ms", "-")
+        print(f"{name:<26}{r['p50_ms']:>12}{r['p95_ms']:>12}{r['items_per_sec']:>12}{base:>15}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline FactSift benchmarks")
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--pdf-pages", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.0, help="artificial per-request server latency (s)")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown before flagging (0.2 = 20%%)")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--check", action="store_true", help="exit with status 1 on regressions")
+    parser.add_argument("--output", help="also write results as JSON to this path")
+    args = parser.parse_args(argv)
+
+    # Keep the HTTP response cache and other on-disk state out of the user's cache
+    os.environ.setdefault("FACTSIFT_CACHE_DIR", tempfile.mkdtemp(prefix="factsift-bench-"))
+    results = run_benchmarks(args.iterations, args.pdf_pages, args.latency)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved baseline to {args.baseline}")
+
+    if args.check and not baseline and not args.save_baseline:
+        print(f"\n⚠️ No baseline at {args.baseline}; record one with --save-baseline")
+        return 1
+    regressions = find_regressions(results, baseline, args.threshold)
+    if regressions:
+        print("\n⚠️ Regressions:")
+        for line in regressions:
+            print(f"  - {line}")
+    return 1 if regressions and args.check else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,206 @@
+import base64
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from http.server import BaseHTTPRequestHandler, SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from benchmarks.fakes import HashingEmbeddings
+
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), "corpus")
+
+# {{date:-3:%Y-%m-%d}} is the date three days before the run, so recency scores don't drift
+_DATE_PLACEHOLDER = re.compile(r"\{\{date:(-?\d+):([^}]*)\}\}")
+
+
+def render_corpus(html: str, now: datetime = None) -> str:
+    """Fill in the corpus's date placeholders relative to `now` (default: the current time)."""
+    now = now or datetime.now(timezone.utc)
+    return _DATE_PLACEHOLDER.sub(lambda m: (now + timedelta(days=int(m.group(1)))).strftime(m.group(2)), html)
+
+
+class _CorpusHandler(SimpleHTTPRequestHandler):
+    """Serves the recorded corpus, optionally with an artificial delay per request."""
+
+    latency = 0.0
+
+    def do_GET(self):
+        if self.latency:
+            time.sleep(self.latency)
+        path = self.translate_path(self.path)
+        if not path.endswith(".html") or not os.path.isfile(path):
+            super().do_GET()
+            return
+        with open(path, "rb") as f:
+            # Like SimpleHTTPRequestHandler: text/html with no charset, so pages rely on <meta charset>
+            body = render_corpus(f.read().decode("utf-8")).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class CorpusServer:
+    """Local HTTP server standing in for news sites.
+
+    Usage:
+        with CorpusServer(latency=0.05) as server:
+            url = server.url("wire-story.html")
+    """
+
+    def __init__(self, directory: str = CORPUS_DIR, latency: float = 0.0, port: int = 0):
+        handler = type("Handler", (_CorpusHandler,), {"latency": latency})
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), partial(handler, directory=directory))
+        self.directory = directory
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def port(self) -> int:
+        return self.httpd.server_address[1]
+
+    def url(self, name: str) -> str:
+        return f"http://127.0.0.1:{self.port}/{name}"
+
+    def urls(self, suffix: str = ".html"):
+        return [self.url(name) for name in sorted(os.listdir(self.directory)) if name.endswith(suffix)]
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class _EmbeddingHandler(BaseHTTPRequestHandler):
+    """OpenAI-compatible POST /v1/embeddings backed by HashingEmbeddings."""
+
+    server_state = None
+
+    def do_POST(self):
+        state = self.server_state
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        texts = body.get("input", [])
+        texts = [texts] if isinstance(texts, str) else [t if isinstance(t, str) else str(t) for t in texts]
+        tokens = sum(max(1, len(t) // 4) for t in texts)
+
+        limited = state.admit(len(texts), tokens)
+        if limited is not None:
+            limit, retry_after = limited
+            message = f"Rate limit reached on {limit} per min ({'TPM' if limit == 'tokens' else 'RPM'})"
+            payload = json.dumps({"error": {"message": message, "type": limit, "code": "rate_limit_exceeded"}})
+            self._reply(429, payload, {"Retry-After": f"{retry_after:.3f}"})
+            return
+        if state.latency:
+            time.sleep(state.latency)
+
+        vectors = state.embeddings.embed_documents(texts)
+        data = []
+        for i, vector in enumerate(vectors):
+            if body.get("encoding_format") == "base64":
+                embedding = base64.b64encode(np.asarray(vector, dtype="<f4").tobytes()).decode("ascii")
+            else:
+                embedding = vector
+            data.append({"object": "embedding", "index": i, "embedding": embedding})
+        self._reply(200, json.dumps({"object": "list", "data": data, "model": body.get("model"),
+                                     "usage": {"prompt_tokens": tokens, "total_tokens": tokens}}))
+
+    def _reply(self, status: int, payload: str, headers: dict = None):
+        encoded = payload.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(encoded)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _EmbeddingServerState:
+    def __init__(self, dimensions: int, latency: float, requests_per_second: float, tokens_per_second: float):
+        self.embeddings = HashingEmbeddings(dimensions)
+        self.latency = latency
+        self.requests_per_second = requests_per_second
+        self.tokens_per_second = tokens_per_second
+        self.lock = threading.Lock()
+        self.window_start = time.monotonic()
+        self.window_requests = 0
+        self.window_tokens = 0
+        self.counts = {"requests": 0, "rate_limited": 0, "inputs": 0, "tokens": 0, "max_batch": 0}
+
+    def admit(self, inputs: int, tokens: int):
+        """None if the request is within this second's limits, else (exhausted limit, seconds to the next window)."""
+        with self.lock:
+            now = time.monotonic()
+            if now - self.window_start >= 1.0:
+                self.window_start, self.window_requests, self.window_tokens = now, 0, 0
+            over_requests = self.requests_per_second and self.window_requests + 1 > self.requests_per_second
+            over_tokens = self.tokens_per_second and self.window_tokens + tokens > self.tokens_per_second
+            if over_requests or over_tokens:
+                self.counts["rate_limited"] += 1
+                return ("requests" if over_requests else "tokens"), self.window_start + 1.0 - now
+            self.window_requests += 1
+            self.window_tokens += tokens
+            self.counts["requests"] += 1
+            self.counts["tokens"] += tokens
+            self.counts["inputs"] += inputs
+            self.counts["max_batch"] = max(self.counts["max_batch"], inputs)
+            return None
+
+
+class FakeEmbeddingServer:
+    """Local stand-in for the OpenAI embeddings API.
+
+    Answers POST /v1/embeddings with HashingEmbeddings vectors, and with 429
+    plus Retry-After once more than `requests_per_second` requests or
+    `tokens_per_second` tokens (about 4 characters each) arrive within one
+    second.
+
+    Usage:
+        with FakeEmbeddingServer(requests_per_second=20) as server:
+            embeddings = server.client()
+    """
+
+    def __init__(self, dimensions: int = 256, latency: float = 0.0, requests_per_second: float = None,
+                 tokens_per_second: float = None, port: int = 0):
+        self.state = _EmbeddingServerState(dimensions, latency, requests_per_second, tokens_per_second)
+        handler = type("Handler", (_EmbeddingHandler,), {"server_state": self.state})
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), handler)
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}/v1"
+
+    @property
+    def counts(self) -> dict:
+        with self.state.lock:
+            return dict(self.state.counts)
+
+    def client(self, model: str = "text-embedding-3-large", max_retries: int = 0):
+        """OpenAIEmbeddings pointed at this server."""
+        from langchain_openai import OpenAIEmbeddings
+        # check_embedding_ctx_length would tokenize with tiktoken, which downloads its vocabulary
+        return OpenAIEmbeddings(model=model, base_url=self.base_url, api_key="benchmark", max_retries=max_retries,
+                                check_embedding_ctx_length=False)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -1,16 +1,74 @@
-from rag_engine.rag_engine import initialize_rag_pipeline, process_query
+import argparse
+import sys
 
-def main():
-    # question = "Latest on Trump"  # Replace with any input or integrate with a CLI
-    # print(f"🔍 Query: {question}")
 
-    # rag_pipeline = initialize_rag_pipeline()
-    # chat_history = []
+def ingest(args):
+    from rag_engine.bulk_ingest import BulkIngestor, discover_sources
+    from rag_engine.clients import shared_clients
+    from rag_engine.embedding_scheduler import BULK
 
-    # answer, _ = process_query(question, rag_pipeline, chat_history)
+    sources = discover_sources(urls_file=args.urls, directory=args.dir)
+    if not sources:
+        print("Nothing to ingest: pass --urls and/or --dir")
+        return 1
 
-    # print("\n📢 Final Answer:\n", answer)
-    pass
+    # Ingestion yields to interactive requests sharing the same scheduler
+    embeddings = shared_clients().embeddings("text-embedding-3-large", priority=BULK)
+    ingestor = BulkIngestor(args.index, embeddings, workers=args.workers, checkpoint_every=args.checkpoint_every)
+    stats = ingestor.run(sources, resume=not args.fresh)
+    print(f"✅ Ingested {stats['ingested']} sources ({stats['failed']} failed, {stats['skipped']} already done) "
+          f"into {stats['chunks']} chunks in {stats['seconds']}s → {args.index}")
+    return 0
+
+
+def ask(args):
+    from rag_engine.rag_engine import RAGPipeline, process_query
+
+    print(f"🔍 Query: {args.question}")
+    rag_pipeline = RAGPipeline(prewarmed_index=args.index)
+    response = process_query(args.question, rag_pipeline, [])
+    print("\n📢 Final Answer:\n", response["answer"])
+    return 0
+
+
+def startup(args):
+    from rag_engine.startup import startup_report
+
+    report = startup_report(runs=args.runs)
+    for entry in report["cold_import"]:
+        print(f"⏱️ import {entry['module']}: {entry['seconds']:.3f}s")
+        for name, seconds in entry["slowest_imports"]:
+            print(f"    {name:<40} {seconds:.3f}s")
+    print("Loaded on first use:")
+    for group, seconds in report["lazy_groups"].items():
+        print(f"    {group:<40} {seconds if isinstance(seconds, str) else f'{seconds:.3f}s'}")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="FactSift command line")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest_parser = commands.add_parser("ingest", help="pre-index URLs or saved HTML/PDFs into a persistent index")
+    ingest_parser.add_argument("--urls", help="file with one URL per line")
+    ingest_parser.add_argument("--dir", help="directory of saved .html/.pdf files")
+    ingest_parser.add_argument("--index", required=True, help="output index path (.npz)")
+    ingest_parser.add_argument("--workers", type=int, default=8)
+    ingest_parser.add_argument("--checkpoint-every", type=int, default=20, help="sources per checkpoint")
+    ingest_parser.add_argument("--fresh", action="store_true", help="ignore any existing index and checkpoint")
+    ingest_parser.set_defaults(func=ingest)
+
+    ask_parser = commands.add_parser("ask", help="answer a news question")
+    ask_parser.add_argument("question")
+    ask_parser.add_argument("--index", help="pre-built index to search alongside live results")
+    ask_parser.set_defaults(func=ask)
+
+    startup_parser = commands.add_parser("startup", help="measure cold-start import times")
+    startup_parser.add_argument("--runs", type=int, default=3, help="fresh interpreters per measurement")
+    startup_parser.set_defaults(func=startup)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,188 @@
+import glob
+import hashlib
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterable, Iterator, List, Optional
+
+from langchain_core.documents import Document
+
+from rag_engine.chunking import NEWS_PROFILE, PDF_PROFILE, Chunk, iter_chunks
+from rag_engine.dedup import NearDuplicateIndex, deduplicate
+from rag_engine.news_article import load_saved_html, load_web_content_hybrid
+from rag_engine.pdf_qa import iter_pdf_documents
+from rag_engine.quality_filtering import credibility_scores
+from rag_engine.vector_index import NumpyVectorStore
+
+def discover_sources(urls_file: Optional[str] = None, directory: Optional[str] = None) -> List[str]:
+    """URLs from a file (one per line, # for comments) and saved HTML/PDFs under a directory."""
+    sources = []
+    if urls_file:
+        with open(urls_file, encoding="utf-8") as f:
+            sources += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    if directory:
+        for root, _, files in os.walk(directory):
+            for name in sorted(files):
+                if name.lower().endswith((".html", ".htm", ".pdf")):
+                    sources.append(os.path.join(root, name))
+    return list(dict.fromkeys(sources))
+
+
+def load_source(source: str, ocr_workers: Optional[int] = None) -> List[Document]:
+    if source.startswith(("http://", "https://")):
+        return [load_web_content_hybrid(source)]
+    if source.lower().endswith(".pdf"):
+        return list(iter_pdf_documents(source, ocr_workers=ocr_workers))
+    return [load_saved_html(source)]
+
+
+class BulkIngestor:
+    """Loads sources with a worker pool into a persistent NumpyVectorStore.
+
+    Every `checkpoint_every` sources the chunks added since the last
+    checkpoint are saved (atomically) as a shard in `<index_path>.shards/`
+    and the finished sources are appended to `<index_path>.checkpoint.jsonl`.
+    At the end of the run the shards are merged into `index_path`. A rerun
+    after a crash reloads the index, its shards and the checkpoint, and
+    skips sources that were already ingested. Chunk ids are derived from
+    source and offset, so replaying a partially checkpointed batch
+    overwrites chunks instead of duplicating them.
+
+    Loading workers share the CPUs for OCR, so scanned PDFs get
+    `cpu_count // workers` OCR processes each.
+
+    News articles that near-duplicate one already ingested (in this run or
+    an earlier one, via `<index_path>.fingerprints.npz`) are not embedded
+    again; their URLs are kept as aliases of the ingested copy.
+    """
+
+    def __init__(self, index_path: str, embeddings, workers: int = 8, checkpoint_every: int = 20):
+        self.index_path = index_path
+        self.checkpoint_path = f"{index_path}.checkpoint.jsonl"
+        self.fingerprints_path = f"{index_path}.fingerprints.npz"
+        self.shard_dir = f"{index_path}.shards"
+        self.embeddings = embeddings
+        self.workers = workers
+        self.checkpoint_every = checkpoint_every
+        self.ocr_workers = max(1, (os.cpu_count() or 1) // workers)
+        self.store = None
+        self.dedup_index = None
+
+    def completed(self) -> set:
+        done = set()
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A crash can leave a truncated last line
+                        continue
+                    if record.get("status") == "done":
+                        done.add(record["source"])
+        return done
+
+    def _shards(self) -> List[str]:
+        return sorted(glob.glob(os.path.join(glob.escape(self.shard_dir), "*.npz")))
+
+    def _open_store(self, resume: bool):
+        if resume and (os.path.exists(self.index_path) or self._shards()):
+            self.store = NumpyVectorStore.load(self.index_path, self.embeddings) \
+                if os.path.exists(self.index_path) else NumpyVectorStore(self.embeddings)
+            # In checkpoint order, so replayed chunks overwrite earlier copies
+            for shard in self._shards():
+                self.store.merge(shard)
+            print(f"Resuming with {len(self.store)} chunks from {self.index_path}")
+        else:
+            self.store = NumpyVectorStore(self.embeddings)
+            for path in (self.checkpoint_path, self.fingerprints_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            shutil.rmtree(self.shard_dir, ignore_errors=True)
+        self.dedup_index = NearDuplicateIndex(self.fingerprints_path)
+
+    def _chunk(self, loaded: dict) -> Iterator[Chunk]:
+        news = [doc for docs in loaded.values() for doc in docs if "page" not in doc.metadata]
+        if news:
+            credibility_scores(news)
+            kept = {id(doc) for doc in deduplicate(news, self.dedup_index, drop_known=True)}
+            loaded = {
+                source: [doc for doc in docs if "page" in doc.metadata or id(doc) in kept]
+                for source, docs in loaded.items()
+            }
+
+        # Same chunking as RAGPipeline.index_documents and PDFContextRetriever
+        for source, docs in loaded.items():
+            profile = PDF_PROFILE if source.lower().endswith(".pdf") else NEWS_PROFILE
+            for chunk in iter_chunks(docs, profile):
+                # Shared by the document's chunks, which all come from this source
+                chunk.metadata["ingest_source"] = source
+                yield chunk
+
+    def _flush(self, loaded: dict, failed: dict):
+        counts = {}
+
+        def chunk_id(chunk: Chunk) -> str:
+            source = chunk.metadata["ingest_source"]
+            counts[source] = counts.get(source, 0) + 1
+            return hashlib.sha1(f"{source}|{chunk.metadata.get('page')}|{chunk.start_index}".encode("utf-8")).hexdigest()
+
+        ids = self.store.add_chunks(self._chunk(loaded), chunk_id)
+
+        # Save the new chunks before recording progress, so the checkpoint never runs ahead of them.
+        # Only this batch is written: dumping the whole index every time grows quadratically.
+        os.makedirs(self.shard_dir, exist_ok=True)
+        shards = self._shards()
+        number = int(os.path.basename(shards[-1]).split(".")[0]) + 1 if shards else 0
+        shard_path = os.path.join(self.shard_dir, f"{number:06d}.npz")
+        self.store.dump(f"{shard_path}.tmp", ids)
+        os.replace(f"{shard_path}.tmp", shard_path)
+        self.dedup_index.save(force=True)
+
+        with open(self.checkpoint_path, "a", encoding="utf-8") as f:
+            for source in loaded:
+                f.write(json.dumps({"source": source, "status": "done", "chunks": counts.get(source, 0)}) + "\n")
+            for source, error in failed.items():
+                f.write(json.dumps({"source": source, "status": "failed", "error": error}) + "\n")
+
+    def _finish(self):
+        """Write the full index once and drop the shards it now contains."""
+        os.makedirs(os.path.dirname(os.path.abspath(self.index_path)), exist_ok=True)
+        tmp_path = f"{self.index_path}.tmp"
+        self.store.dump(tmp_path)
+        os.replace(tmp_path, self.index_path)
+        shutil.rmtree(self.shard_dir, ignore_errors=True)
+
+    def run(self, sources: Iterable[str], resume: bool = True) -> dict:
+        self._open_store(resume)
+        done = self.completed() if resume else set()
+        pending = [s for s in sources if s not in done]
+        print(f"📥 {len(pending)} sources to ingest ({len(done)} already done)")
+
+        stats = {"ingested": 0, "failed": 0, "skipped": len(done)}
+        start = time.perf_counter()
+        loaded, failed = {}, {}
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(load_source, source, self.ocr_workers): source for source in pending}
+            for future in as_completed(futures):
+                source = futures[future]
+                try:
+                    loaded[source] = future.result()
+                    stats["ingested"] += 1
+                except Exception as e:
+                    print(f"[Error loading {source}]: {e}")
+                    failed[source] = str(e)
+                    stats["failed"] += 1
+                if len(loaded) + len(failed) >= self.checkpoint_every:
+                    self._flush(loaded, failed)
+                    loaded, failed = {}, {}
+        if loaded or failed:
+            self._flush(loaded, failed)
+        if pending or self._shards() or not os.path.exists(self.index_path):
+            self._finish()
+
+        stats["chunks"] = len(self.store)
+        stats["seconds"] = round(time.perf_counter() - start, 2)
+        return stats
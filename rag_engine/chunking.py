@@ -0,0 +1,145 @@
+import re
+import sys
+from typing import Iterable, Iterator, List, NamedTuple, Tuple
+
+from langchain_core.documents import Document
+
+
+class ChunkProfile(NamedTuple):
+    """Chunk size and overlap in characters; overlap is whole sentences up to `chunk_overlap`."""
+    chunk_size: int
+    chunk_overlap: int
+
+
+NEWS_PROFILE = ChunkProfile(chunk_size=800, chunk_overlap=200)
+PDF_PROFILE = ChunkProfile(chunk_size=1000, chunk_overlap=200)
+PROFILES = {"news": NEWS_PROFILE, "pdf": PDF_PROFILE}
+
+_PARAGRAPH_BREAK = re.compile(r"\n[ \t\r\f\v]*\n\s*")
+# End of a sentence: terminal punctuation, optional closing quotes/brackets, then whitespace
+_SENTENCE_END = re.compile(r"[.!?…][\"'”’)\]]*\s+")
+
+
+class TextView:
+    """Characters [start, end) of a document's text, without copying them.
+
+    Every chunk of a document holds a reference to the same string, so the
+    text is stored once however many (overlapping) chunks it is split into.
+    """
+
+    __slots__ = ("base", "start", "end")
+
+    def __init__(self, base: str, start: int, end: int):
+        self.base = base
+        self.start = start
+        self.end = end
+
+    def __str__(self) -> str:
+        return self.base[self.start:self.end]
+
+    def __len__(self) -> int:
+        return self.end - self.start
+
+    def __repr__(self) -> str:
+        return f"TextView({self.start}, {self.end})"
+
+
+class Chunk(NamedTuple):
+    view: TextView
+    # One dict per document, shared by all of its chunks
+    metadata: dict
+
+    @property
+    def page_content(self) -> str:
+        return str(self.view)
+
+    @property
+    def start_index(self) -> int:
+        return self.view.start
+
+    def to_document(self) -> Document:
+        return Document(page_content=self.page_content, metadata={**self.metadata, "start_index": self.view.start})
+
+
+def _units(text: str, max_size: int) -> List[Tuple[int, int, int]]:
+    """(start, end, paragraph) of every sentence, with sentences over `max_size` cut at word breaks."""
+    units = []
+    paragraph_start = 0
+    breaks = [(m.start(), m.end()) for m in _PARAGRAPH_BREAK.finditer(text)] + [(len(text), len(text))]
+    for paragraph, (break_start, break_end) in enumerate(breaks):
+        sentence_start = paragraph_start
+        ends = [m.start() + len(m.group().rstrip()) for m in _SENTENCE_END.finditer(text, paragraph_start, break_start)]
+        for end in ends + [break_start]:
+            start = sentence_start
+            while start < end and text[start].isspace():
+                start += 1
+            stop = end
+            while stop > start and text[stop - 1].isspace():
+                stop -= 1
+            while stop - start > max_size:
+                cut = text.rfind(" ", start + 1, start + max_size + 1)
+                cut = cut if cut > start else start + max_size
+                units.append((start, cut, paragraph))
+                start = cut
+                while start < stop and text[start].isspace():
+                    start += 1
+            if stop > start:
+                units.append((start, stop, paragraph))
+            sentence_start = end
+        paragraph_start = break_end
+    return units
+
+
+def split_spans(text: str, profile: ChunkProfile = NEWS_PROFILE) -> Iterator[Tuple[int, int]]:
+    """Yield (start, end) offsets of the chunks of `text`.
+
+    Chunks are whole sentences packed up to `chunk_size` characters. Once a
+    chunk is at least half full it ends at a paragraph break rather than
+    take in only the start of the next paragraph. Consecutive
+    chunks share trailing sentences of up to `chunk_overlap` characters, but
+    only within a paragraph.
+    """
+    size, overlap = profile.chunk_size, profile.chunk_overlap
+    units = _units(text, size)
+    paragraph_ends = {paragraph: end for _, end, paragraph in units}
+    i = 0
+    while i < len(units):
+        start, end, paragraph = units[i]
+        j = i
+        while j + 1 < len(units) and units[j + 1][1] - start <= size:
+            next_paragraph = units[j + 1][2]
+            if (next_paragraph != paragraph and end - start >= size // 2
+                    and paragraph_ends[next_paragraph] - start > size):
+                break
+            j += 1
+            end, paragraph = units[j][1], units[j][2]
+        yield start, end
+        if j + 1 >= len(units):
+            return
+
+        following = units[j + 1]
+        k = j + 1
+        while (k - 1 > i and units[k - 1][2] == following[2] and end - units[k - 1][0] <= overlap
+               and following[1] - units[k - 1][0] <= size):
+            k -= 1
+        i = k
+
+
+def intern_metadata(metadata: dict) -> dict:
+    """Shallow copy of a document's metadata with short string values interned.
+
+    Values such as structured data and keyword lists are shared with the
+    document rather than copied, and repeated strings (domains, extraction
+    methods) are stored once across documents.
+    """
+    return {key: sys.intern(value) if isinstance(value, str) and len(value) <= 256 else value
+            for key, value in metadata.items()}
+
+
+def iter_chunks(docs: Iterable[Document], profile: ChunkProfile = NEWS_PROFILE) -> Iterator[Chunk]:
+    """Lazily chunk `docs`; each document is split only when its chunks are consumed."""
+    for doc in docs:
+        text = doc.page_content
+        metadata = intern_metadata(doc.metadata)
+        for start, end in split_spans(text, profile):
+            yield Chunk(TextView(text, start, end), metadata)
@@ -0,0 +1,80 @@
+import threading
+from typing import Dict, Tuple
+
+from rag_engine.embedding_cache import CachedEmbeddings
+from rag_engine.embedding_scheduler import INTERACTIVE, EmbeddingScheduler, ScheduledEmbeddings, scheduler_limits
+from rag_engine.fetch_pool import shared_session
+from rag_engine.prompts import BUNDLED_PROMPTS, bundled_prompt
+
+
+class ClientPool:
+    """Process-wide LLM, embedding and prompt clients.
+
+    Each client is created once per configuration and then shared by every
+    pipeline and session in the process, together with their HTTP
+    connection pools. Only stateless clients belong here; per-request state
+    (vector stores, chat history, traces) stays with the caller.
+
+    All embedding clients of one model share an EmbeddingScheduler, so
+    concurrent sessions are batched and rate limited together; `priority`
+    decides whose chunks go first.
+
+    The OpenAI client libraries are imported when the first client is
+    created, not when this module is imported.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._chat_models: Dict[Tuple, object] = {}
+        self._embeddings: Dict[Tuple[str, int], CachedEmbeddings] = {}
+        self._schedulers: Dict[str, EmbeddingScheduler] = {}
+        self._prompts: Dict[str, object] = {}
+
+    def chat_model(self, model: str = "gpt-4.1", **kwargs):
+        key = (model, tuple(sorted(kwargs.items())))
+        with self._lock:
+            if key not in self._chat_models:
+                from langchain.chat_models import init_chat_model
+                self._chat_models[key] = init_chat_model(model, model_provider="openai", **kwargs)
+            return self._chat_models[key]
+
+    def embeddings(self, model: str = "text-embedding-3-large", priority: int = INTERACTIVE) -> CachedEmbeddings:
+        """Cached embeddings whose cache misses are sent through the model's scheduler at `priority`."""
+        with self._lock:
+            key = (model, priority)
+            if key not in self._embeddings:
+                self._embeddings[key] = CachedEmbeddings(ScheduledEmbeddings(self._scheduler(model), priority))
+            return self._embeddings[key]
+
+    def scheduler(self, model: str = "text-embedding-3-large") -> EmbeddingScheduler:
+        with self._lock:
+            return self._scheduler(model)
+
+    def _scheduler(self, model: str) -> EmbeddingScheduler:
+        if model not in self._schedulers:
+            from langchain_openai import OpenAIEmbeddings
+            # No client-side retries: the scheduler retries 429s (backing off for everyone) and transient errors
+            self._schedulers[model] = EmbeddingScheduler(OpenAIEmbeddings(model=model, max_retries=0),
+                                                         **scheduler_limits())
+        return self._schedulers[model]
+
+    def prompt(self, name: str = "rlm/rag-prompt"):
+        """A bundled prompt when there is one, otherwise pulled from LangChain Hub once."""
+        with self._lock:
+            if name not in self._prompts:
+                if name in BUNDLED_PROMPTS:
+                    self._prompts[name] = bundled_prompt(name)
+                else:
+                    from langchain import hub
+                    self._prompts[name] = hub.pull(name)
+            return self._prompts[name]
+
+    @property
+    def http(self):
+        return shared_session()
+
+
+_pool = ClientPool()
+
+def shared_clients() -> ClientPool:
+    return _pool
@@ -0,0 +1,167 @@
+import math
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from langchain_core.documents import Document
+
+from rag_engine.fusion import ScoredChunk
+
+# OpenAI tokenizers average about 4 characters per token on English prose.
+# Budgets only need to be approximately right, and estimating needs no
+# tokenizer download (tiktoken fetches its vocabularies on first use).
+CHARS_PER_TOKEN = 4
+# Role and delimiter tokens the chat format adds around every message
+MESSAGE_OVERHEAD = 4
+
+TokenCounter = Callable[[str], int]
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+class PackedContext(NamedTuple):
+    chunks: List[ScoredChunk]  # best first; overlapping neighbours merged into one passage
+    text: str
+    tokens: int
+    merged: int   # chunks absorbed into an overlapping neighbour
+    dropped: int  # chunks left out because the budget was full
+
+
+class PackedHistory(NamedTuple):
+    messages: List[dict]
+    tokens: int
+    truncated: int  # older messages cut down to a short excerpt
+    dropped: int    # oldest messages left out because the budget was full
+
+
+def _shorten(text: str, tokens: int, count_tokens: TokenCounter = estimate_tokens) -> str:
+    """Cut `text` to about `tokens`, preferring a sentence or word boundary."""
+    if count_tokens(text) <= tokens:
+        return text
+    limit = max(1, tokens * CHARS_PER_TOKEN)
+    cut = text[:limit]
+    sentence = max(cut.rfind(". "), cut.rfind("! "), cut.rfind("? "), cut.rfind("\n"))
+    if sentence >= limit // 2:
+        cut = cut[:sentence + 1]
+    elif " " in cut:
+        cut = cut[:cut.rfind(" ")]
+    return cut.rstrip() + " …"
+
+
+def _span_key(doc: Document) -> Tuple[Optional[tuple], Optional[int]]:
+    """Chunks of the same article (and PDF page) with a start offset can be spliced."""
+    start = doc.metadata.get("start_index")
+    if start is None or start < 0:
+        return None, None
+    return (doc.metadata.get("source"), doc.metadata.get("page")), start
+
+
+def pack_context(context: Sequence[Union[ScoredChunk, Document]], budget: int,
+                 count_tokens: TokenCounter = estimate_tokens, separator: str = "\n\n") -> PackedContext:
+    """Fill `budget` tokens with the best chunks of `context` (ranked best first).
+
+    Chunks from the same source whose character ranges overlap (see
+    rag_engine.chunking; neighbours share up to 200 characters) are spliced
+    into one passage, so the shared text is sent once. A chunk that does not fit is
+    skipped and smaller ones further down may still fill the gap. If not
+    even the best chunk fits, it is truncated to the budget.
+    """
+    spans: List[dict] = []
+    by_key: Dict[tuple, List[dict]] = {}
+    used = merged = dropped = 0
+    separator_tokens = count_tokens(separator)
+
+    for rank, item in enumerate(context):
+        chunk = item if isinstance(item, ScoredChunk) else ScoredChunk(item, 0.0, 0.0, 0.0, 0.0)
+        text = chunk.document.page_content
+        key, start = _span_key(chunk.document)
+        span = {"rank": rank, "chunk": chunk, "key": key, "start": start, "text": text,
+                "end": None if start is None else start + len(text), "tokens": count_tokens(text)}
+
+        overlapping = [s for s in by_key.get(key, []) if s["start"] <= span["end"] and span["start"] <= s["end"]] \
+            if key is not None else []
+        if overlapping:
+            parts = sorted(overlapping + [span], key=lambda s: s["start"])
+            combined, end = parts[0]["text"], parts[0]["end"]
+            for part in parts[1:]:
+                if part["end"] > end:
+                    combined += part["text"][end - part["start"]:]
+                    end = part["end"]
+            new_tokens = count_tokens(combined)
+            cost = new_tokens - sum(s["tokens"] for s in overlapping)
+        else:
+            cost = span["tokens"] + (separator_tokens if spans else 0)
+
+        if used + cost > budget:
+            if spans:
+                dropped += 1
+                continue
+            # Nothing selected yet: better a truncated best chunk than no context
+            text = _shorten(text, budget, count_tokens)
+            span.update(text=text, tokens=count_tokens(text), key=None)
+            cost = span["tokens"]
+
+        used += cost
+        if overlapping:
+            target = min(overlapping, key=lambda s: s["rank"])
+            for absorbed in overlapping:
+                if absorbed is not target:
+                    spans.remove(absorbed)
+                    by_key[key].remove(absorbed)
+            target.update(text=combined, start=parts[0]["start"], end=end, tokens=new_tokens)
+            merged += len(overlapping)
+        else:
+            spans.append(span)
+            if span["key"] is not None:
+                by_key.setdefault(key, []).append(span)
+
+    chunks = []
+    for span in spans:
+        chunk = span["chunk"]
+        if span["text"] is not chunk.document.page_content:
+            # Metadata is shared with the vector store, so the merged passage gets its own copy
+            doc = Document(page_content=span["text"],
+                           metadata={**chunk.document.metadata, "start_index": span["start"]})
+            chunk = chunk._replace(document=doc)
+        chunks.append(chunk)
+    text = separator.join(c.document.page_content for c in chunks)
+    return PackedContext(chunks, text, count_tokens(text) if text else 0, merged, dropped)
+
+
+def _as_message(message) -> dict:
+    """Accept ("user" | "bot", text) tuples from older sessions alongside message dicts."""
+    if isinstance(message, dict):
+        return message
+    role, content = message[0], message[1]
+    return {"role": "assistant" if role == "bot" else role, "content": content}
+
+
+def pack_history(history: Sequence[dict], budget: int, keep_recent: int = 4, excerpt_tokens: int = 60,
+                 count_tokens: TokenCounter = estimate_tokens) -> PackedHistory:
+    """Fit the chat history into `budget` tokens, newest messages first.
+
+    The last `keep_recent` messages are kept verbatim when they fit; older
+    ones are cut down to an excerpt of about `excerpt_tokens`, and once the
+    budget is spent the rest are dropped. The result always starts with a
+    user turn so no answer is left without its question.
+    """
+    kept, used = [], 0
+    messages = [_as_message(m) for m in history]
+    for age, message in enumerate(reversed(messages)):
+        content = str(message.get("content", ""))
+        shortened = content if age < keep_recent else _shorten(content, excerpt_tokens, count_tokens)
+        cost = count_tokens(shortened) + MESSAGE_OVERHEAD
+        if used + cost > budget and shortened is content:
+            shortened = _shorten(content, excerpt_tokens, count_tokens)
+            cost = count_tokens(shortened) + MESSAGE_OVERHEAD
+        if used + cost > budget:
+            break
+        used += cost
+        if shortened is not content:
+            message = {**message, "content": shortened}
+        kept.append((message, cost, shortened is not content))
+
+    while kept and kept[-1][0].get("role") != "user":
+        used -= kept.pop()[1]
+    kept.reverse()
+    return PackedHistory([m for m, _, _ in kept], used, sum(t for _, _, t in kept), len(messages) - len(kept))
@@ -0,0 +1,248 @@
+import atexit
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+import time
+import weakref
+from typing import List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from rag_engine.embedding_cache import DEFAULT_CACHE_DIR
+
+
+class MinHasher:
+    """MinHash signatures over word shingles.
+
+    Shingles are hashed to 64 bits and permuted with the multiply-shift
+    family ((a*x + b) mod 2^64) >> 32, which wraps natively in uint64.
+    """
+
+    def __init__(self, num_perm: int = 128, shingle: int = 3, seed: int = 7):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.shingle = shingle
+        self._a = rng.integers(0, 1 << 64, size=(num_perm, 1), dtype=np.uint64, endpoint=False) | np.uint64(1)
+        self._b = rng.integers(0, 1 << 64, size=(num_perm, 1), dtype=np.uint64, endpoint=False)
+
+    def shingles(self, text: str) -> set:
+        tokens = re.findall(r"\w+", text.lower())
+        k = self.shingle
+        return {" ".join(tokens[i:i + k]) for i in range(max(1, len(tokens) - k + 1))}
+
+    def signature(self, text: str) -> Tuple[np.ndarray, int]:
+        """(signature, number of distinct shingles)"""
+        shingles = self.shingles(text)
+        hashes = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little") for s in shingles),
+            dtype=np.uint64, count=len(shingles),
+        )
+        permuted = (self._a * hashes[None, :] + self._b) >> np.uint64(32)
+        return permuted.min(axis=1), len(shingles)
+
+
+def containment(sig_a: np.ndarray, size_a: int, sig_b: np.ndarray, size_b: int) -> float:
+    """Estimated share of the smaller text's shingles found in the other.
+
+    Syndicated copies are often truncated, so containment catches them where
+    plain Jaccard similarity would not.
+    """
+    jaccard = float(np.mean(sig_a == sig_b))
+    if not size_a or not size_b:
+        return 0.0
+    intersection = jaccard * (size_a + size_b) / (1.0 + jaccard)
+    return min(1.0, intersection / min(size_a, size_b))
+
+
+class NearDuplicateIndex:
+    """Persistent MinHash LSH index of article fingerprints.
+
+    Each entry is a canonical source URL with its signature and the aliases
+    (other URLs carrying the same story) seen so far. Candidates come from
+    LSH band buckets and are confirmed with the containment estimate.
+    """
+
+    def __init__(self, path: Optional[str] = None, num_perm: int = 128, bands: int = 32,
+                 threshold: float = 0.8, max_entries: int = 20000, save_interval: float = 30.0):
+        self.path = path
+        self.hasher = MinHasher(num_perm)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.save_interval = save_interval
+
+        self._sources: List[str] = []
+        self._signatures: List[np.ndarray] = []
+        self._sizes: List[int] = []
+        self.aliases = {}
+        self._rows_by_source = {}
+        self._buckets = {}
+        self._lock = threading.RLock()
+        self._dirty = False
+        self._saved_at = 0.0
+
+        if path and os.path.exists(path):
+            self.load()
+        if path:
+            # save() is throttled to save_interval; don't lose the last fingerprints on exit
+            atexit.register(_save_on_exit, weakref.ref(self))
+
+    def __len__(self) -> int:
+        return len(self._sources)
+
+    def _band_keys(self, signature: np.ndarray):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def _insert(self, source: str, signature: np.ndarray, size: int):
+        row = len(self._sources)
+        self._sources.append(source)
+        self._signatures.append(signature)
+        self._sizes.append(size)
+        self._rows_by_source[source] = row
+        for key in self._band_keys(signature):
+            self._buckets.setdefault(key, []).append(row)
+
+    def _rebuild(self, keep: slice):
+        sources, signatures, sizes = self._sources[keep], self._signatures[keep], self._sizes[keep]
+        self._sources, self._signatures, self._sizes = [], [], []
+        self._rows_by_source, self._buckets = {}, {}
+        for source, signature, size in zip(sources, signatures, sizes):
+            self._insert(source, signature, size)
+        self.aliases = {s: a for s, a in self.aliases.items() if s in self._rows_by_source}
+
+    def find(self, signature: np.ndarray, size: int, exclude: Optional[str] = None) -> Optional[str]:
+        """Canonical source of the closest known near-duplicate, if any."""
+        with self._lock:
+            candidates = set()
+            for key in self._band_keys(signature):
+                candidates.update(self._buckets.get(key, ()))
+            best, best_score = None, self.threshold
+            for row in candidates:
+                if self._sources[row] == exclude:
+                    continue
+                score = containment(signature, size, self._signatures[row], self._sizes[row])
+                if score >= best_score:
+                    best, best_score = self._sources[row], score
+            return best
+
+    def add(self, source: str, signature: np.ndarray, size: int, aliases=()):
+        with self._lock:
+            if source not in self._rows_by_source:
+                self._insert(source, signature, size)
+                if len(self._sources) > self.max_entries:
+                    # Drop the oldest tenth in one go rather than rebuilding per insert
+                    self._rebuild(slice(len(self._sources) - int(self.max_entries * 0.9), None))
+            if aliases:
+                self.aliases.setdefault(source, set()).update(a for a in aliases if a != source)
+            self._dirty = True
+
+    def add_alias(self, source: str, alias: str):
+        """Record `alias` as another URL carrying the already indexed `source` story."""
+        with self._lock:
+            if alias != source:
+                self.aliases.setdefault(source, set()).add(alias)
+                self._dirty = True
+
+    def save(self, force: bool = False):
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty or (not force and time.time() - self._saved_at < self.save_interval):
+                return
+            records = json.dumps({
+                "sources": self._sources,
+                "sizes": self._sizes,
+                "aliases": {s: sorted(a) for s, a in self.aliases.items()},
+            })
+            signatures = np.stack(self._signatures) if self._signatures else np.zeros((0, self.hasher.num_perm), np.uint64)
+            buffer = io.BytesIO()
+            np.savez(buffer, signatures=signatures, records=np.frombuffer(records.encode("utf-8"), dtype=np.uint8))
+            self._dirty = False
+            self._saved_at = time.time()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(buffer.getvalue())
+        os.replace(tmp_path, self.path)
+
+    def load(self):
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                records = json.loads(data["records"].tobytes().decode("utf-8"))
+                signatures = data["signatures"]
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ Ignoring unreadable fingerprint index {self.path}: {e}")
+            return
+        with self._lock:
+            for source, signature, size in zip(records["sources"], signatures, records["sizes"]):
+                self._insert(source, signature, size)
+            self.aliases = {s: set(a) for s, a in records["aliases"].items()}
+
+
+def _save_on_exit(ref):
+    index = ref()
+    if index is not None:
+        index.save(force=True)
+
+
+_default_index = None
+
+def default_index() -> NearDuplicateIndex:
+    """Process-wide fingerprint index persisted in the FactSift cache directory."""
+    global _default_index
+    if _default_index is None:
+        _default_index = NearDuplicateIndex(os.path.join(DEFAULT_CACHE_DIR, "near_duplicates.npz"))
+    return _default_index
+
+
+def deduplicate(docs: List[Document], index: Optional[NearDuplicateIndex] = None,
+                drop_known: bool = False) -> List[Document]:
+    """Collapse near-duplicate articles, keeping the highest quality_score copy.
+
+    The other copies' sources are listed in the kept document's `aliases`
+    metadata. With `drop_known`, documents that duplicate a story already in
+    the persistent index (from an earlier query or ingest run) are dropped
+    as well; otherwise they are kept and inherit the known aliases.
+    """
+    index = default_index() if index is None else index
+    ranked = sorted(docs, key=lambda d: d.metadata.get("quality_score") or 0.0, reverse=True)
+
+    kept, fingerprints = [], []
+    for doc in ranked:
+        source = doc.metadata.get("source")
+        signature, size = index.hasher.signature(doc.page_content)
+
+        # Duplicate of a better copy in this batch
+        duplicate_of = next(
+            (k for k, (sig, n) in zip(kept, fingerprints) if containment(signature, size, sig, n) >= index.threshold),
+            None,
+        )
+        if duplicate_of is not None:
+            duplicate_of.metadata.setdefault("aliases", []).append(source)
+            continue
+
+        known = index.find(signature, size, exclude=source)
+        if known is not None:
+            if drop_known:
+                index.add_alias(known, source)
+                continue
+            doc.metadata["aliases"] = sorted(index.aliases.get(known, set()) | {known})
+
+        kept.append(doc)
+        fingerprints.append((signature, size))
+
+    for doc, (signature, size) in zip(kept, fingerprints):
+        source = doc.metadata.get("source")
+        if source:
+            index.add(source, signature, size, aliases=doc.metadata.get("aliases", ()))
+    index.save()
+
+    if len(kept) < len(docs):
+        print(f"🧹 Collapsed {len(docs) - len(kept)} near-duplicate article(s)")
+    return kept
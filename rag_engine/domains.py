@@ -0,0 +1,10 @@
+import tldextract
+
+# Use the public suffix snapshot packaged with tldextract: no download on
+# first use and no cache directory, so workers start without network access.
+_extract = tldextract.TLDExtract(suffix_list_urls=(), cache_dir=None)
+
+
+def extract(url):
+    """tldextract.extract without network access"""
+    return _extract(url)
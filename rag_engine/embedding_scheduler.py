@@ -0,0 +1,331 @@
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from rag_engine.context_packer import estimate_tokens
+
+# Lower runs first: a user's question, then chunks a user is waiting on, then bulk ingestion
+QUERY = 0
+INTERACTIVE = 1
+BULK = 2
+
+
+class RateLimited(Exception):
+    """Raised by an embedding client when the API answers 429.
+
+    `retry_after` is the suggested wait in seconds, if any, and `limit` says
+    whether "requests" or "tokens" per minute ran out.
+    """
+
+    def __init__(self, retry_after: Optional[float] = None, limit: str = "requests"):
+        super().__init__(f"{limit} rate limit reached (retry after {retry_after}s)")
+        self.retry_after = retry_after
+        self.limit = limit
+
+
+def _rate_limit(error: Exception) -> Optional[RateLimited]:
+    """`error` as a RateLimited if it is a 429 from the API (e.g. openai.RateLimitError), else None."""
+    if isinstance(error, RateLimited):
+        return error
+    response = getattr(error, "response", None)
+    status = getattr(error, "status_code", None) or getattr(response, "status_code", None)
+    if status != 429:
+        return None
+    try:
+        retry_after = float(response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        retry_after = None
+    # OpenAI names the exhausted limit: "... on tokens per min (TPM)" or "... on requests per min (RPM)"
+    message = str(error).lower()
+    return RateLimited(retry_after, "tokens" if "tokens" in message or "tpm" in message else "requests")
+
+
+def _transient(error: Exception) -> bool:
+    """Whether `error` is worth retrying: a timeout, a dropped connection or a 5xx from the API."""
+    response = getattr(error, "response", None)
+    status = getattr(error, "status_code", None) or getattr(response, "status_code", None)
+    if isinstance(status, int):
+        return status in (408, 409) or status >= 500
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    # openai.APIConnectionError / APITimeoutError, without importing openai here
+    return any(cls.__name__ in ("APIConnectionError", "APITimeoutError") for cls in type(error).__mro__)
+
+
+def _backoff(attempts: int) -> float:
+    """Exponential backoff with jitter, capped at a minute."""
+    return min(60.0, 0.5 * 2 ** (attempts - 1)) * (0.5 + random.random())
+
+
+class TokenBucket:
+    """Allows `rate` units per second on average with bursts of up to `capacity`.
+
+    `acquire` blocks until the units are available.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = max(capacity or rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount: float = 1.0) -> float:
+        """Take `amount` units (at most one full bucket); returns the seconds spent waiting."""
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return waited
+                delay = (amount - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def drain(self):
+        """Drop the saved-up burst, e.g. after the server said we were too fast."""
+        with self._lock:
+            self._tokens = 0.0
+            self._updated = time.monotonic()
+
+
+class _Item:
+    __slots__ = ("text", "tokens", "future", "attempts", "caller", "isolated")
+
+    def __init__(self, text: str, caller: int):
+        self.text = text
+        self.tokens = estimate_tokens(text)
+        self.future = Future()
+        self.attempts = 0
+        # The embed() call the text came from; isolated items are only batched with their own call's texts
+        self.caller = caller
+        self.isolated = False
+
+
+class EmbeddingScheduler:
+    """Process-wide queue in front of one embedding model.
+
+    Texts from concurrent callers (queries, PDF uploads, bulk ingestion) are
+    merged into batches of up to `batch_size` texts and `max_batch_tokens`
+    tokens, highest priority first, and at most `max_concurrent` batches
+    are in flight. Requests and tokens per minute are held under the API
+    limits with token buckets.
+
+    A 429 pauses all sending (for the server's Retry-After, or exponential
+    backoff with jitter) and puts the batch back in the queue. Timeouts,
+    connection errors and 5xx responses put the batch back after the same
+    backoff, without pausing other batches. If a batch that merges several
+    calls still fails, each call's texts are retried in batches of their
+    own, so one bad input only fails the call it came from.
+
+    The batch size adapts to which limit was hit: it is halved when tokens
+    per minute ran out and doubled when requests per minute did, since
+    fewer, larger requests carry the same texts. Successful full batches
+    grow it slowly, up to `max_batch_size`.
+    """
+
+    def __init__(self, embeddings: Embeddings, max_batch_size: int = 256, min_batch_size: int = 8,
+                 max_batch_tokens: int = 100_000, max_concurrent: int = 3, requests_per_minute: Optional[float] = 3000,
+                 tokens_per_minute: Optional[float] = 1_000_000, max_retries: int = 8, linger: float = 0.005):
+        self.embeddings = embeddings
+        self.max_batch_size = max_batch_size
+        self.min_batch_size = min_batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.max_concurrent = max_concurrent
+        self.max_retries = max_retries
+        self.linger = linger
+        self.batch_size = max(min_batch_size, max_batch_size // 4)
+        self.requests = TokenBucket(requests_per_minute / 60) if requests_per_minute else None
+        # Bucket holds up to one max-size batch so large batches can always be sent
+        self.tokens = TokenBucket(tokens_per_minute / 60, max(tokens_per_minute / 60, max_batch_tokens)) \
+            if tokens_per_minute else None
+
+        self._heap = []
+        self._sequence = itertools.count()
+        self._callers = itertools.count()
+        self._cond = threading.Condition()
+        self._slots = threading.Semaphore(max_concurrent)
+        # After a 429 nothing is sent before this (time.monotonic())
+        self._paused_until = 0.0
+        self._pool = None
+        self._dispatcher = None
+        self._stats = {"batches": 0, "texts": 0, "rate_limited": 0, "failed_batches": 0, "retried_batches": 0,
+                       "isolated_batches": 0, "throttled_seconds": 0.0}
+
+    def embed(self, texts: List[str], priority: int = INTERACTIVE) -> List[List[float]]:
+        """Embed `texts`, blocking until every one has been through a batch."""
+        if not texts:
+            return []
+        caller = next(self._callers)
+        items = [_Item(text, caller) for text in texts]
+        with self._cond:
+            self._start()
+            for item in items:
+                heapq.heappush(self._heap, (priority, next(self._sequence), item))
+            self._cond.notify()
+        wait([item.future for item in items])
+        return [item.future.result() for item in items]
+
+    def _start(self):
+        if self._dispatcher is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_concurrent, thread_name_prefix="factsift-embed")
+            self._dispatcher = threading.Thread(target=self._dispatch, name="factsift-embed-dispatch", daemon=True)
+            self._dispatcher.start()
+
+    def _dispatch(self):
+        while True:
+            with self._cond:
+                while not self._heap:
+                    self._cond.wait()
+                filling = len(self._heap) < self.batch_size
+            if filling and self.linger:
+                # Give concurrent callers a moment to add to this batch
+                time.sleep(self.linger)
+            # Wait for a free slot before choosing the batch, so anything more urgent queued meanwhile goes first
+            self._slots.acquire()
+            with self._cond:
+                batch, tokens = [], 0
+                while self._heap and len(batch) < self.batch_size:
+                    item = self._heap[0][2]
+                    if batch and tokens + item.tokens > self.max_batch_tokens:
+                        break
+                    if batch and (item.isolated or batch[0][2].isolated) and item.caller != batch[0][2].caller:
+                        break
+                    entry = heapq.heappop(self._heap)
+                    batch.append(entry)
+                    tokens += item.tokens
+            if batch:
+                self._pool.submit(self._send, batch, tokens)
+            else:
+                self._slots.release()
+
+    def _send(self, batch: list, tokens: int):
+        try:
+            throttled = max(0.0, self._paused_until - time.monotonic())
+            if throttled:
+                time.sleep(throttled)
+            if self.requests:
+                throttled += self.requests.acquire()
+            if self.tokens:
+                throttled += self.tokens.acquire(tokens)
+            try:
+                vectors = self.embeddings.embed_documents([entry[2].text for entry in batch])
+            except Exception as e:
+                limited = _rate_limit(e)
+                if limited is not None:
+                    self._rate_limited(batch, limited, e)
+                elif not self._retry(batch, e):
+                    raise
+                return
+            with self._cond:
+                self._stats["batches"] += 1
+                self._stats["texts"] += len(batch)
+                self._stats["throttled_seconds"] += throttled
+                # Additive increase after a successful batch
+                if len(batch) >= self.batch_size:
+                    self.batch_size = min(self.max_batch_size, self.batch_size + max(1, self.batch_size // 4))
+            for entry, vector in zip(batch, vectors):
+                entry[2].future.set_result(vector)
+        except Exception as e:
+            if self._isolate(batch):
+                return
+            with self._cond:
+                self._stats["failed_batches"] += 1
+            for entry in batch:
+                if not entry[2].future.done():
+                    entry[2].future.set_exception(e)
+        finally:
+            self._slots.release()
+
+    def _requeue(self, batch: list):
+        with self._cond:
+            # Requeued entries keep their priority and order
+            for entry in batch:
+                heapq.heappush(self._heap, entry)
+            self._cond.notify()
+
+    def _retry(self, batch: list, error: Exception) -> bool:
+        """Requeue `batch` after a backoff if `error` is transient and retries remain."""
+        attempts = max(entry[2].attempts for entry in batch) + 1
+        if not _transient(error) or attempts > self.max_retries:
+            return False
+        for entry in batch:
+            entry[2].attempts = attempts
+        with self._cond:
+            self._stats["retried_batches"] += 1
+        timer = threading.Timer(_backoff(attempts), self._requeue, [batch])
+        timer.daemon = True
+        timer.start()
+        return True
+
+    def _isolate(self, batch: list) -> bool:
+        """Requeue a failed batch of several calls' texts so each call is retried on its own."""
+        if len({entry[2].caller for entry in batch}) < 2:
+            return False
+        for entry in batch:
+            entry[2].isolated = True
+        with self._cond:
+            self._stats["isolated_batches"] += 1
+        self._requeue(batch)
+        return True
+
+    def _rate_limited(self, batch: list, limited: RateLimited, error: Exception):
+        attempts = max(entry[2].attempts for entry in batch) + 1
+        if attempts > self.max_retries:
+            raise error
+        delay = limited.retry_after or _backoff(attempts)
+        for bucket in (self.requests, self.tokens):
+            if bucket:
+                bucket.drain()
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+            self._stats["rate_limited"] += 1
+            if limited.limit == "tokens":
+                self.batch_size = max(self.min_batch_size, self.batch_size // 2)
+            else:
+                self.batch_size = min(self.max_batch_size, self.batch_size * 2)
+            for entry in batch:
+                entry[2].attempts = attempts
+        self._requeue(batch)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {**self._stats, "queued": len(self._heap), "batch_size": self.batch_size}
+
+
+class ScheduledEmbeddings(Embeddings):
+    """Embeddings that send every request through an EmbeddingScheduler at one priority.
+
+    Queries go through the same batches at QUERY priority, which assumes a
+    symmetric model (as OpenAI's are) where a query embeds like a document.
+    """
+
+    def __init__(self, scheduler: EmbeddingScheduler, priority: int = INTERACTIVE):
+        self.scheduler = scheduler
+        self.priority = priority
+        # Keeps CachedEmbeddings keys the same as for the unscheduled model
+        self.model = getattr(scheduler.embeddings, "model", type(scheduler.embeddings).__name__)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.scheduler.embed(texts, self.priority)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.scheduler.embed([text], QUERY)[0]
+
+
+def scheduler_limits() -> dict:
+    """Rate limits from FACTSIFT_EMBED_RPM / FACTSIFT_EMBED_TPM (0 disables a limit)."""
+    rpm = float(os.getenv("FACTSIFT_EMBED_RPM", "3000"))
+    tpm = float(os.getenv("FACTSIFT_EMBED_TPM", "1000000"))
+    return {"requests_per_minute": rpm or None, "tokens_per_minute": tpm or None}
@@ -0,0 +1,104 @@
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class HostLimiter:
+    """Caps the number of in-flight requests against any single host."""
+
+    def __init__(self, per_host: int = 2):
+        self.per_host = per_host
+        self._lock = threading.Lock()
+        self._semaphores: Dict[str, threading.Semaphore] = defaultdict(
+            lambda: threading.BoundedSemaphore(self.per_host)
+        )
+
+    def semaphore(self, url: str) -> threading.Semaphore:
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            return self._semaphores[host]
+
+
+_session = None
+_session_lock = threading.Lock()
+
+def shared_session(pool_size: int = 32) -> requests.Session:
+    """Process-wide HTTP session, so concurrent queries reuse keep-alive connections."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+
+def fetch_all(
+    urls: List[str],
+    loader: Callable[[str], object],
+    max_workers: int = 8,
+    per_host: int = 2,
+    deadline: Optional[float] = 20.0,
+    on_result: Optional[Callable[[str, object], None]] = None,
+) -> List[object]:
+    """Load every URL at most once with bounded concurrency.
+
+    Results are returned in the order of `urls`. Anything that has not
+    finished when `deadline` seconds have elapsed is abandoned, so callers
+    always get whatever arrived in time. Failed loads are skipped.
+    """
+    # Each URL is fetched exactly once, even if the search repeats it
+    unique_urls = list(dict.fromkeys(u for u in urls if u))
+    if not unique_urls:
+        return []
+
+    limiter = HostLimiter(per_host)
+    expires_at = time.monotonic() + deadline if deadline is not None else None
+
+    def run(url):
+        with limiter.semaphore(url):
+            # Don't start work that can no longer make the deadline
+            if expires_at is not None and time.monotonic() >= expires_at:
+                return None
+            return loader(url)
+
+    results = {}
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(unique_urls)))
+    try:
+        pending = {executor.submit(run, url): url for url in unique_urls}
+        while pending:
+            timeout = None
+            if expires_at is not None:
+                timeout = expires_at - time.monotonic()
+                if timeout <= 0:
+                    break
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                url = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"[Error loading {url}]: {e}")
+                    continue
+                if result is None:
+                    continue
+                results[url] = result
+                if on_result:
+                    on_result(url, result)
+        if pending:
+            print(f"⏱️ Deadline reached, skipping {len(pending)} slow URL(s)")
+    finally:
+        # Don't block on stragglers; their results are discarded
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return [results[url] for url in unique_urls if url in results]
@@ -0,0 +1,96 @@
+from datetime import datetime, timezone
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from rag_engine.quality_filtering import to_timestamp
+
+
+class ScoredChunk(NamedTuple):
+    """Immutable selection result; the chunk's shared metadata is never modified."""
+    document: Document
+    similarity: float
+    quality: float
+    recency: float
+    final_score: float
+
+
+def _quality(doc: Document) -> float:
+    quality = doc.metadata.get("quality_score")
+    return 0.5 if quality is None else quality
+
+
+def recency_scores(docs: Sequence[Document], window_days: float = 10.0, now: Optional[float] = None) -> np.ndarray:
+    """1.0 for today, falling linearly to 0 after `window_days`; 0 when the date is unknown."""
+    now = datetime.now(timezone.utc).timestamp() if now is None else now
+    published = np.fromiter((to_timestamp(d.metadata.get("publish_date")) for d in docs), dtype=np.float64, count=len(docs))
+    days_old = np.maximum((now - published) / 86400.0, 0.0)
+    return np.where(np.isnan(days_old), 0.0, np.clip(1.0 - days_old / window_days, 0.0, 1.0))
+
+
+def _mmr(final: np.ndarray, vectors: np.ndarray, top_n: int, mmr_lambda: float) -> List[int]:
+    """Greedy maximal marginal relevance over normalized vectors."""
+    similarity = vectors @ vectors.T
+    selected = [int(np.argmax(final))]
+    redundancy = similarity[selected[0]].copy()
+    while len(selected) < min(top_n, len(final)):
+        mmr = mmr_lambda * final - (1.0 - mmr_lambda) * redundancy
+        mmr[selected] = -np.inf
+        best = int(np.argmax(mmr))
+        selected.append(best)
+        redundancy = np.maximum(redundancy, similarity[best])
+    return selected
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[Tuple[Document, float]]], top_k: int = 10, k: int = 60,
+                           weights: Optional[Sequence[float]] = None) -> List[Tuple[Document, float]]:
+    """Merge ranked (Document, score) lists, e.g. dense and BM25 results.
+
+    A document scores sum(weight / (k + rank)) over the lists it appears
+    in, so only ranks matter and cosine and BM25 scales need no
+    calibration. Scores are divided by the best possible total (first in
+    every list), which keeps them in (0, 1] like the cosine similarities
+    fuse_scores is tuned for.
+    """
+    weights = list(weights) if weights is not None else [1.0] * len(rankings)
+    best = sum(w / (k + 1) for w in weights) or 1.0
+    fused, docs = {}, {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, (doc, _) in enumerate(ranking, start=1):
+            key = doc.id or id(doc)
+            docs.setdefault(key, doc)
+            fused[key] = fused.get(key, 0.0) + weight / (k + rank)
+    order = sorted(fused, key=fused.get, reverse=True)[:top_k]
+    return [(docs[key], fused[key] / best) for key in order]
+
+
+def fuse_scores(context: Sequence[Tuple[Document, float]], top_n: int = 3, alpha: float = 0.8, beta: float = 0.2,
+                gamma: float = 0.0, mmr_lambda: Optional[float] = None, vectors: Optional[np.ndarray] = None,
+                now: Optional[float] = None) -> List[ScoredChunk]:
+    """Rank candidates by alpha * similarity + beta * quality + gamma * recency.
+
+    With `mmr_lambda` and the candidates' normalized `vectors`, the top_n
+    are picked by maximal marginal relevance instead, trading score for
+    diversity. Documents missing a quality_score count as 0.5.
+    """
+    if not context or top_n <= 0:
+        return []
+    docs = [doc for doc, _ in context]
+    similarity = np.fromiter((score for _, score in context), dtype=np.float64, count=len(context))
+    quality = np.fromiter((_quality(d) for d in docs), dtype=np.float64, count=len(docs))
+    recency = recency_scores(docs, now=now) if gamma else np.zeros(len(docs))
+    final = alpha * similarity + beta * quality + gamma * recency
+
+    if mmr_lambda is not None and vectors is not None and len(vectors) == len(docs):
+        order = _mmr(final, np.asarray(vectors, dtype=np.float32), top_n, mmr_lambda)
+    elif top_n >= len(final):
+        order = np.argsort(-final, kind="stable")
+    else:
+        top = np.argpartition(-final, top_n - 1)[:top_n]
+        order = top[np.argsort(-final[top], kind="stable")]
+
+    return [
+        ScoredChunk(docs[i], float(similarity[i]), float(quality[i]), float(recency[i]), float(final[i]))
+        for i in order
+    ]
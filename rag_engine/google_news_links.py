@@ -1,9 +1,11 @@
+from typing import List
+
 from duckduckgo_search import DDGS
 
-def simple_google_search(query: str, num_results: int=10):
+def search_results(query: str, num_results: int = 10) -> List[dict]:
+    """Raw DuckDuckGo results: dicts with 'href', 'title' and 'body' (the snippet)."""
     with DDGS() as ddgs:
-        results = ddgs.text("Latest on Donald Trump", max_results = num_results)
-        res = []
-        for r in results:
-            res.append(r['href'])
-        return res
\ No newline at end of file
+        return list(ddgs.text(query, max_results = num_results) or [])
+
+def simple_google_search(query: str, num_results: int=10):
+    return [r['href'] for r in search_results(query, num_results)]
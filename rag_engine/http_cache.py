@@ -0,0 +1,242 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import NamedTuple, Optional
+from urllib.parse import urlparse
+
+from urllib3.util.request import ACCEPT_ENCODING
+
+from rag_engine import domains
+from rag_engine.embedding_cache import DEFAULT_CACHE_DIR
+from rag_engine.fetch_pool import shared_session
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
+    # Only advertise encodings urllib3 can decode here (br needs the brotli package)
+    "Accept-Encoding": ACCEPT_ENCODING,
+}
+
+LOCAL_HOSTS = {"localhost", "127.0.0.1", "::1"}
+
+
+class CachedResponse(NamedTuple):
+    url: str
+    content: bytes
+    encoding: Optional[str]
+    status_code: int
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fresh_until: float
+
+
+class FetchResult(NamedTuple):
+    url: str
+    content: bytes
+    encoding: Optional[str]
+    status_code: int
+    # "network" (full download), "revalidated" (304) or "cache" (still fresh, no request)
+    cache_status: str
+    downloaded_bytes: int
+
+
+def header_charset(content_type: str) -> Optional[str]:
+    """Charset declared in a Content-Type header, or None.
+
+    requests reports ISO-8859-1 for any text/* response without one, which
+    would override the page's own <meta charset>.
+    """
+    match = re.search(r"charset\s*=\s*[\"']?([\w.:-]+)", content_type or "", re.I)
+    return match.group(1) if match else None
+
+
+def _max_age(cache_control: str) -> Optional[float]:
+    match = re.search(r"(?:s-maxage|max-age)\s*=\s*(\d+)", cache_control)
+    return float(match.group(1)) if match else None
+
+
+class HTTPCache:
+    """Size-bounded on-disk store of response bodies and their validators.
+
+    Bodies live in SQLite next to the embedding cache, keyed by URL. Once the
+    stored bodies exceed `max_bytes`, the least recently used responses are
+    evicted.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_bytes: int = 256 * 1024 * 1024):
+        self.path = path or os.path.join(DEFAULT_CACHE_DIR, "http_cache.sqlite")
+        self.max_bytes = max_bytes
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "url TEXT PRIMARY KEY, body BLOB NOT NULL, encoding TEXT, status INTEGER NOT NULL, "
+            "etag TEXT, last_modified TEXT, fresh_until REAL NOT NULL, size INTEGER NOT NULL, "
+            "last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses(last_used)")
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] < 1:
+            # Older entries stored requests' ISO-8859-1 default for pages without a header charset
+            self._conn.execute("UPDATE responses SET encoding = NULL WHERE encoding = 'ISO-8859-1'")
+            self._conn.execute("PRAGMA user_version = 1")
+        self._conn.commit()
+        self._bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def get(self, url: str) -> Optional[CachedResponse]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, encoding, status, etag, last_modified, fresh_until FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE responses SET last_used = ? WHERE url = ?", (time.time(), url))
+            self._conn.commit()
+        return CachedResponse(url, *row)
+
+    def put(self, response: CachedResponse):
+        size = len(response.content)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._conn.execute("SELECT size FROM responses WHERE url = ?", (response.url,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(url, body, encoding, status, etag, last_modified, fresh_until, size, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (response.url, response.content, response.encoding, response.status_code, response.etag,
+                 response.last_modified, response.fresh_until, size, time.time()),
+            )
+            self._bytes += size - (previous[0] if previous else 0)
+            while self._bytes > self.max_bytes:
+                rows = self._conn.execute(
+                    "SELECT url, size FROM responses ORDER BY last_used ASC LIMIT 50"
+                ).fetchall()
+                if not rows:
+                    break
+                for url, evicted in rows:
+                    self._conn.execute("DELETE FROM responses WHERE url = ?", (url,))
+                    self._bytes -= evicted
+                    if self._bytes <= self.max_bytes:
+                        break
+            self._conn.commit()
+
+    def refresh(self, url: str, fresh_until: float):
+        """Mark a revalidated (304) response as fresh again."""
+        with self._lock:
+            self._conn.execute("UPDATE responses SET fresh_until = ?, last_used = ? WHERE url = ?",
+                               (fresh_until, time.time(), url))
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {"entries": entries, "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+
+class DomainPoliteness:
+    """Per registered domain: at most `max_concurrent` requests in flight and
+    at least `min_interval` seconds between request starts, process-wide."""
+
+    def __init__(self, max_concurrent: int = 2, min_interval: float = 0.25):
+        self.max_concurrent = max_concurrent
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._semaphores = defaultdict(lambda: threading.BoundedSemaphore(self.max_concurrent))
+        self._next_start = defaultdict(float)
+
+    def _domain(self, url: str) -> str:
+        ext = domains.extract(url)
+        return f"{ext.domain}.{ext.suffix}" if ext.suffix else ext.domain or url
+
+    @contextmanager
+    def slot(self, url: str):
+        if urlparse(url).hostname in LOCAL_HOSTS:
+            # Local mirrors and test servers are not rate limited
+            yield
+            return
+        domain = self._domain(url)
+        with self._lock:
+            semaphore = self._semaphores[domain]
+        with semaphore:
+            with self._lock:
+                start = max(time.monotonic(), self._next_start[domain])
+                self._next_start[domain] = start + self.min_interval
+            delay = start - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            yield
+
+
+class Fetcher:
+    """Shared article downloader: pooled keep-alive connections, compressed
+    transfer, conditional revalidation against the on-disk cache and
+    per-domain politeness.
+
+    A cached response still fresh under its Cache-Control max-age is served
+    without a request; otherwise it is revalidated with If-None-Match /
+    If-Modified-Since, and a 304 reuses the stored body.
+    """
+
+    def __init__(self, cache: Optional[HTTPCache] = None, politeness: Optional[DomainPoliteness] = None,
+                 session=None, timeout: float = 10.0):
+        self.cache = cache
+        self.politeness = politeness or DomainPoliteness()
+        self.session = session or shared_session()
+        self.timeout = timeout
+        self.counts = defaultdict(int)
+
+    def get(self, url: str, revalidate: bool = False, timeout: Optional[float] = None) -> FetchResult:
+        """Fetch `url`; `revalidate` ignores max-age freshness and always asks the server."""
+        cached = self.cache.get(url) if self.cache else None
+        if cached and not revalidate and cached.fresh_until > time.time():
+            self.counts["cache"] += 1
+            return FetchResult(url, cached.content, cached.encoding, cached.status_code, "cache", 0)
+
+        headers = dict(DEFAULT_HEADERS)
+        if cached:
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+
+        with self.politeness.slot(url):
+            response = self.session.get(url, headers=headers, timeout=timeout or self.timeout)
+
+        cache_control = response.headers.get("Cache-Control", "").lower()
+        max_age = _max_age(cache_control)
+        fresh_until = time.time() + max_age if max_age and "no-cache" not in cache_control else 0.0
+
+        if cached and response.status_code == 304:
+            self.cache.refresh(url, fresh_until)
+            self.counts["revalidated"] += 1
+            return FetchResult(url, cached.content, cached.encoding, cached.status_code, "revalidated", 0)
+
+        response.raise_for_status()
+        # None leaves detection from the body (<meta charset>, then the bytes) to the parsers
+        encoding = header_charset(response.headers.get("Content-Type"))
+        downloaded = int(response.headers.get("Content-Length") or len(response.content))
+        if self.cache and "no-store" not in cache_control:
+            self.cache.put(CachedResponse(url, response.content, encoding, response.status_code,
+                                          response.headers.get("ETag"), response.headers.get("Last-Modified"),
+                                          fresh_until))
+        self.counts["network"] += 1
+        return FetchResult(url, response.content, encoding, response.status_code, "network", downloaded)
+
+
+_fetcher = None
+_fetcher_lock = threading.Lock()
+
+def shared_fetcher() -> Fetcher:
+    """Process-wide Fetcher with the on-disk cache (FACTSIFT_HTTP_CACHE_MB, default 256)."""
+    global _fetcher
+    with _fetcher_lock:
+        if _fetcher is None:
+            max_mb = float(os.getenv("FACTSIFT_HTTP_CACHE_MB", "256"))
+            _fetcher = Fetcher(cache=HTTPCache(max_bytes=int(max_mb * 1024 * 1024)) if max_mb > 0 else None)
+        return _fetcher
@@ -0,0 +1,95 @@
+import heapq
+import math
+import re
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Numbers keep their separators and a trailing % ("4.25%", "12,000"), so figures match exactly
+_TOKEN = re.compile(r"\d+(?:[.,]\d+)*%?|[^\W_]+")
+
+STOPWORDS = frozenset("""
+a an and are as at be but by did do does for from had has have he her his how i if in into is it its
+me my of on or our she so than that the their them then there these they this to was we were what
+when where which who why will with would you your
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+
+class BM25Index:
+    """Inverted index scored with Okapi BM25, updated one document at a time.
+
+    Postings map each term to {doc_id: term frequency}. Document frequencies
+    and the average length are read at query time, so adding and removing
+    documents never requires a rebuild.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._lengths: Dict[str, int] = {}
+        # Terms of each document, so removing one only touches its own postings
+        self._terms: Dict[str, Tuple[str, ...]] = {}
+        self._total_length = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def add(self, doc_id: str, text: str):
+        counts = Counter(tokenize(text))
+        with self._lock:
+            self._remove(doc_id)
+            for term, tf in counts.items():
+                self._postings.setdefault(term, {})[doc_id] = tf
+            length = sum(counts.values())
+            self._terms[doc_id] = tuple(counts)
+            self._lengths[doc_id] = length
+            self._total_length += length
+
+    def remove(self, doc_id: str):
+        with self._lock:
+            self._remove(doc_id)
+
+    def _remove(self, doc_id: str):
+        length = self._lengths.pop(doc_id, None)
+        if length is None:
+            return
+        self._total_length -= length
+        for term in self._terms.pop(doc_id):
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+
+    def search(self, query: str, k: int = 10, ids: Optional[Iterable[str]] = None) -> List[Tuple[str, float]]:
+        """Best `k` (doc_id, score) pairs for `query`, optionally among `ids` only."""
+        terms = set(tokenize(query))
+        allowed = set(ids) if ids is not None else None
+        scores: Dict[str, float] = {}
+        with self._lock:
+            n = len(self._lengths)
+            if not n or not terms:
+                return []
+            average = self._total_length / n or 1.0
+            lengths = self._lengths
+            k1, b = self.k1, self.b
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1.0 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+                weight = idf * (k1 + 1.0)
+                if allowed is not None and len(allowed) < len(postings):
+                    # Probe the postings from the smaller side
+                    postings = {doc_id: postings[doc_id] for doc_id in allowed if doc_id in postings}
+                for doc_id, tf in postings.items():
+                    if allowed is not None and doc_id not in allowed:
+                        continue
+                    norm = tf + k1 * (1.0 - b + b * lengths[doc_id] / average)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + weight * tf / norm
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
@@ -1,18 +1,135 @@
+import hashlib
+import multiprocessing
 import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from dotenv import load_dotenv
+from typing import Callable, Dict, Iterable, NamedTuple, Optional, Set
 from typing_extensions import List, TypedDict
 
-from langchain.document_loaders import PyPDFLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
-from langchain_core.vectorstores import InMemoryVectorStore
-from langchain_openai import OpenAIEmbeddings
-from langchain.chat_models import init_chat_model
-from langchain import hub
 
-import fitz  # PyMuPDF
-from PIL import Image
-import pytesseract
+from rag_engine.chunking import Chunk, ChunkProfile, iter_chunks
+from rag_engine.clients import shared_clients
+from rag_engine.context_packer import pack_context
+from rag_engine.fusion import reciprocal_rank_fusion
+from rag_engine.vector_index import NumpyVectorStore
+
+
+def _ocr_page(file_path: str, page_number: int):
+    """Render and OCR a single page. Runs in a worker process."""
+    # OCR dependencies are only loaded by processes that actually OCR
+    import fitz  # PyMuPDF
+    import pytesseract
+    from PIL import Image
+
+    with fitz.open(file_path) as doc:
+        pix = doc.load_page(page_number).get_pixmap()
+        img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+    try:
+        return page_number, pytesseract.image_to_string(img)
+    except pytesseract.TesseractNotFoundError as e:
+        # Not picklable, so it would surface as BrokenProcessPool in the parent
+        raise RuntimeError(str(e)) from None
+
+
+class PageScan(NamedTuple):
+    text_pages: Dict[int, str]
+    scanned_pages: List[int]
+    # Content hash of every page, in page order
+    hashes: List[str]
+
+
+def _page_hash(doc, page, text: str) -> str:
+    """Hash of what a page's chunks are built from: its text layer, or for
+    scanned pages the drawing commands and embedded images."""
+    digest = hashlib.sha256()
+    if text.strip():
+        digest.update(b"text\0" + text.encode("utf-8"))
+    else:
+        digest.update(f"scan\0{page.rotation}\0".encode("utf-8") + page.read_contents())
+        for image in page.get_images(full=True):
+            digest.update(doc.xref_stream_raw(image[0]) or b"")
+    return digest.hexdigest()
+
+
+def scan_pages(file_path: str) -> PageScan:
+    """One pass over the PDF: text layers, pages that need OCR, and page hashes."""
+    import fitz  # PyMuPDF
+
+    text_pages, scanned_pages, hashes = {}, [], []
+    with fitz.open(file_path) as doc:
+        for i, page in enumerate(doc):
+            text = page.get_text()
+            if text.strip():
+                text_pages[i] = text
+            else:
+                scanned_pages.append(i)
+            hashes.append(_page_hash(doc, page, text))
+    return PageScan(text_pages, scanned_pages, hashes)
+
+
+def iter_ocr_pages(file_path: str, pages=None, workers: int = None):
+    """OCR pages across a process pool, yielding one Document per page as it finishes.
+
+    The pages are submitted to the pool when this is called, not on the
+    first iteration, so OCR runs while the caller is busy with other work.
+    """
+    if pages is None:
+        import fitz  # PyMuPDF
+        with fitz.open(file_path) as doc:
+            pages = range(len(doc))
+    pages = list(pages)
+
+    workers = min(workers or os.cpu_count() or 1, len(pages))
+    if workers <= 1:
+        return (_ocr_document(file_path, *_ocr_page(file_path, i)) for i in pages)
+
+    # spawn, not fork: the parent runs threads (Streamlit, embedding scheduler, fetch pool) whose locks a fork could copy held
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    futures = [pool.submit(_ocr_page, file_path, i) for i in pages]
+    return _iter_completed(file_path, pool, futures)
+
+
+def _ocr_document(file_path: str, page_number: int, text: str) -> Document:
+    return Document(page_content=text, metadata={"source": file_path, "page": page_number})
+
+
+def _iter_completed(file_path: str, pool: ProcessPoolExecutor, futures):
+    try:
+        for future in as_completed(futures):
+            yield _ocr_document(file_path, *future.result())
+    finally:
+        # Also reached when the caller stops early or a page fails: drop the pages not started yet
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def iter_pdf_documents(file_path: str, ocr_workers: int = None, pages: Optional[Iterable[int]] = None,
+                       scan: Optional[PageScan] = None):
+    """Yield one Document per page, OCR-ing only pages without a text layer.
+
+    `pages` restricts extraction to those page numbers, and a `scan` from
+    scan_pages avoids reading the file again. Each Document carries its
+    page's content hash as "page_hash". Pages with a text layer come
+    first, while the scanned pages are already being OCR'd.
+    """
+    scan = scan or scan_pages(file_path)
+    wanted = set(range(len(scan.hashes)) if pages is None else pages)
+    scanned_pages = [i for i in scan.scanned_pages if i in wanted]
+
+    if scanned_pages:
+        print(f'PDF needs OCR on {len(scanned_pages)} of {len(scan.hashes)} pages')
+    # Submitted before the text pages are yielded, so OCR overlaps with their chunking and embedding
+    ocr_documents = iter_ocr_pages(file_path, scanned_pages, ocr_workers)
+    try:
+        # Pages that already have a text layer skip OCR entirely
+        for i, text in scan.text_pages.items():
+            if i in wanted:
+                yield Document(page_content=text, metadata={"source": file_path, "page": i, "page_hash": scan.hashes[i]})
+        for doc in ocr_documents:
+            doc.metadata["page_hash"] = scan.hashes[doc.metadata["page"]]
+            yield doc
+    finally:
+        ocr_documents.close()
 
 
 class State(TypedDict):
@@ -21,60 +138,122 @@ class State(TypedDict):
     answer: str
 
 class PDFContextRetriever:
-    def __init__(self, file_path: str, chunk_size: int = 1000, chunk_overlap: int = 200):
+    """Question answering over one PDF.
+
+    Chunks are stored under ids derived from their page's content hash (see
+    `page_keys`). `previous_chunks`, given the page keys of this document,
+    returns stores from earlier builds (e.g. an older revision of the same
+    contract); pages found there are copied over with their vectors instead
+    of being extracted, OCR'd and embedded again.
+    """
+
+    def __init__(self, file_path: str, chunk_size: int = 1000, chunk_overlap: int = 200, index_path: str = None,
+                 ocr_workers: int = None, embed_batch_size: int = 64, llm=None, embeddings=None, prompt=None,
+                 previous_chunks: Optional[Callable[[Set[str]], Iterable[NumpyVectorStore]]] = None,
+                 context_tokens: int = 3000):
         self.file_path = file_path
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
-        self.embeddings = OpenAIEmbeddings(model="text-embedding-3-large")
-        self.vector_store = InMemoryVectorStore(self.embeddings)
-        self.prompt = hub.pull('rlm/rag-prompt')
-        self.llm = init_chat_model(model="gpt-4.1-nano", model_provider='openai')
-        self._prepare_documents()
-
-    def has_extractable_text(self):
-        doc = fitz.open(self.file_path)
-        for page in doc:
-            if page.get_text():
-                return True
-        return False
-    
-    def perform_ocr(self):
-        doc = fitz.open(self.file_path)
-        t = ''
-        # Iterate over PDF pages and convert to images
-        for i in range(len(doc)):
-            page = doc.load_page(i)
-            pix = page.get_pixmap()
-            img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-            text = pytesseract.image_to_string(img)
-            # t += f"Page {i + 1} text:\n{text}\n"
-            t += text
-        return t
-
-    def _prepare_documents(self):
-        if self.has_extractable_text():
-            print('PDF Extractable')
-            loader = PyPDFLoader(self.file_path)
-            docs = loader.load()
+        self.ocr_workers = ocr_workers or os.cpu_count() or 1
+        self.embed_batch_size = embed_batch_size
+        self.context_tokens = context_tokens
+        clients = shared_clients()
+        self.embeddings = embeddings or clients.embeddings("text-embedding-3-large")
+        self.prompt = prompt or clients.prompt("rlm/rag-prompt")
+        self.llm = llm or clients.chat_model("gpt-4.1-nano")
+        self.page_keys: List[str] = []
+        self.reused_pages = 0
+        self.processed_pages = 0
+        if index_path and os.path.exists(index_path):
+            # Reuse a previously built index instead of re-parsing the PDF
+            self.vector_store = NumpyVectorStore.load(index_path, self.embeddings, approximate=True, lexical=True)
+            self.page_keys = sorted({m["page_key"] for m in self._metadatas() if "page_key" in m})
         else:
-            print('PDF needs OCR')
-            raw_text = self.perform_ocr()
-            docs = [Document(page_content=raw_text)]
-
-        splitter = RecursiveCharacterTextSplitter(
-            chunk_size=self.chunk_size,
-            chunk_overlap=self.chunk_overlap,
-            add_start_index=True
-        )
-        all_splits = splitter.split_documents(docs)  
-        self.vector_store.add_documents(documents=all_splits)
+            self.vector_store = NumpyVectorStore(self.embeddings, approximate=True, lexical=True)
+            self._prepare_documents(previous_chunks)
+
+    def save_index(self, index_path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(index_path)), exist_ok=True)
+        self.vector_store.dump(index_path)
+
+    def memory_usage(self) -> int:
+        """Rough size in bytes of the in-memory index."""
+        return self.vector_store.nbytes
+
+    def iter_ocr_pages(self, pages=None):
+        return iter_ocr_pages(self.file_path, pages, self.ocr_workers)
+
+    def perform_ocr(self):
+        pages = sorted(self.iter_ocr_pages(), key=lambda d: d.metadata["page"])
+        return "".join(doc.page_content for doc in pages)
+
+    def _metadatas(self):
+        return [doc.metadata for doc in self.vector_store.get_by_ids(self.vector_store.ids())]
+
+    def _page_key(self, page_hash: str) -> str:
+        """Page hash qualified by the chunking parameters its chunks were built with"""
+        return hashlib.sha256(f"{page_hash}|{self.chunk_size}|{self.chunk_overlap}".encode("utf-8")).hexdigest()[:32]
+
+    def _reuse(self, stores: Iterable[NumpyVectorStore], pages: Dict[str, List[int]]) -> Set[str]:
+        """Copy chunks of unchanged pages from earlier stores; returns the page keys found."""
+        found = set()
+        for store in stores:
+            by_key = {}
+            for chunk_id in store.ids():
+                key = chunk_id.split(".", 1)[0]
+                if key in pages and key not in found:
+                    by_key.setdefault(key, []).append(chunk_id)
+            for key, chunk_ids in by_key.items():
+                docs = store.get_by_ids(chunk_ids)
+                vectors = store.get_vectors(chunk_ids)
+                # The same page may sit at a different position (or repeat) in this revision
+                for occurrence, page in enumerate(pages[key]):
+                    self.vector_store.add_vectors(
+                        vectors,
+                        [doc.page_content for doc in docs],
+                        [{**doc.metadata, "source": self.file_path, "page": page} for doc in docs],
+                        [f"{key}.{occurrence}.{doc.metadata.get('start_index')}" for doc in docs],
+                    )
+                found.add(key)
+        return found
+
+    def _prepare_documents(self, previous_chunks=None):
+        scan = scan_pages(self.file_path)
+        self.page_keys = [self._page_key(h) for h in scan.hashes]
+        pages, occurrences = {}, {}
+        for page, key in enumerate(self.page_keys):
+            occurrences[page] = len(pages.setdefault(key, []))
+            pages[key].append(page)
+
+        reused = self._reuse(previous_chunks(set(pages)), pages) if previous_chunks else set()
+        todo = [page for page, key in enumerate(self.page_keys) if key not in reused]
+        self.reused_pages = len(self.page_keys) - len(todo)
+        self.processed_pages = len(todo)
+        if self.reused_pages:
+            print(f"Reusing {self.reused_pages} unchanged pages, extracting {len(todo)}")
+
+        def documents():
+            for doc in iter_pdf_documents(self.file_path, self.ocr_workers, pages=todo, scan=scan):
+                doc.metadata["page_key"] = self.page_keys[doc.metadata["page"]]
+                yield doc
+
+        # Ids are "<page key>.<occurrence>.<start index>" so later revisions can find them
+        def chunk_id(chunk: Chunk) -> str:
+            return f"{chunk.metadata['page_key']}.{occurrences[chunk.metadata['page']]}.{chunk.start_index}"
+
+        # Pages are chunked as extraction and OCR deliver them and embedded in batches meanwhile
+        chunks = iter_chunks(documents(), ChunkProfile(self.chunk_size, self.chunk_overlap))
+        self.vector_store.add_chunks(chunks, chunk_id, batch_size=self.embed_batch_size)
 
     def retrieve_context(self, question: str, top_k: int = 2):
-        results = self.vector_store.similarity_search(question, k=top_k)
-        return results
+        # Dense and BM25 results merged by rank, so exact terms (clause numbers, names) aren't missed
+        dense = self.vector_store.similarity_search_with_score(question, k=top_k)
+        lexical = self.vector_store.lexical_search_with_score(question, k=top_k)
+        return [doc for doc, _ in reciprocal_rank_fusion([dense, lexical], top_k=top_k)]
     
     def generate(self, question: str, context: List[Document]):
-        docs_content = "\n\n".join([doc.page_content for doc in context])
+        # Neighbouring chunks of a page overlap; send the shared text once
+        docs_content = pack_context(context, self.context_tokens).text
         messages = self.prompt.invoke({"question": question, "context": docs_content})
         response = self.llm.invoke(messages)
         return response.content
@@ -0,0 +1,130 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from rag_engine.embedding_cache import DEFAULT_CACHE_DIR
+from rag_engine.pdf_qa import PDFContextRetriever
+from rag_engine.vector_index import NumpyVectorStore
+
+
+def file_sha256(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class PDFRetrieverRegistry:
+    """Builds one PDFContextRetriever per distinct document and reuses it.
+
+    Retrievers are keyed by the SHA-256 of the file contents, so re-uploads
+    of the same PDF (under any name or temp path) share one index. Built
+    indexes are saved under `index_dir` and reloaded on later runs. When
+    the in-memory indexes exceed `max_bytes`, the least recently used ones
+    are dropped; they can be reloaded from disk on the next question.
+
+    A manifest (`pages.json`) maps page content keys to the index holding
+    them, so a revised upload only extracts and embeds the pages that
+    changed; the rest are copied from the earlier revision's index.
+    """
+
+    def __init__(self, index_dir: str = None, max_bytes: int = 512 * 1024 * 1024, **retriever_kwargs):
+        self.index_dir = index_dir or os.path.join(DEFAULT_CACHE_DIR, "pdf_indexes")
+        self.max_bytes = max_bytes
+        # Passed to every PDFContextRetriever (e.g. llm, embeddings, chunk_size)
+        self.retriever_kwargs = retriever_kwargs
+        self._retrievers = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.Lock()
+        self._build_locks = {}
+        self._manifest_path = os.path.join(self.index_dir, "pages.json")
+        self._page_owners = None
+
+    def _index_path(self, key: str) -> str:
+        return os.path.join(self.index_dir, f"{key}.npz")
+
+    def _load_manifest(self) -> dict:
+        if self._page_owners is None:
+            self._page_owners = {}
+            if os.path.exists(self._manifest_path):
+                try:
+                    with open(self._manifest_path, encoding="utf-8") as f:
+                        self._page_owners = json.load(f)
+                except (OSError, ValueError) as e:
+                    print(f"⚠️ Ignoring unreadable page manifest: {e}")
+        return self._page_owners
+
+    def _record_pages(self, key: str, retriever: PDFContextRetriever):
+        with self._lock:
+            owners = self._load_manifest()
+            owners.update({page_key: key for page_key in retriever.page_keys})
+            # Forget pages whose index has been deleted
+            live = {k for k in set(owners.values()) if os.path.exists(self._index_path(k))}
+            self._page_owners = {p: k for p, k in owners.items() if k in live}
+            tmp_path = f"{self._manifest_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._page_owners, f)
+            os.replace(tmp_path, self._manifest_path)
+
+    def _previous_chunks(self, page_keys):
+        """Stores (in memory, else loaded from disk) that already hold some of `page_keys`."""
+        with self._lock:
+            owners = self._load_manifest()
+            keys = {owners[p] for p in page_keys if p in owners}
+            in_memory = {k: self._retrievers[k].vector_store for k in keys if k in self._retrievers}
+        for key in keys:
+            if key in in_memory:
+                yield in_memory[key]
+            elif os.path.exists(self._index_path(key)):
+                # Only read from (chunks and vectors are copied), never queried, so no embedder
+                yield NumpyVectorStore.load(self._index_path(key), None)
+
+    def get(self, file_path: str) -> PDFContextRetriever:
+        key = file_sha256(file_path)
+        with self._lock:
+            if key in self._retrievers:
+                self._retrievers.move_to_end(key)
+                return self._retrievers[key]
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+
+        # Only one thread parses a given document; others wait for it
+        with build_lock:
+            with self._lock:
+                if key in self._retrievers:
+                    self._retrievers.move_to_end(key)
+                    return self._retrievers[key]
+
+            index_path = self._index_path(key)
+            if os.path.exists(index_path):
+                print(f"Loading cached PDF index {key[:12]}")
+                retriever = PDFContextRetriever(file_path=file_path, index_path=index_path, **self.retriever_kwargs)
+            else:
+                retriever = PDFContextRetriever(file_path=file_path, previous_chunks=self._previous_chunks,
+                                                **self.retriever_kwargs)
+                retriever.save_index(index_path)
+                self._record_pages(key, retriever)
+
+            with self._lock:
+                self._retrievers[key] = retriever
+                self._sizes[key] = retriever.memory_usage()
+                self._evict()
+                self._build_locks.pop(key, None)
+        return retriever
+
+    def _evict(self):
+        # Always keep the most recent retriever, even if it alone is over budget
+        while len(self._retrievers) > 1 and sum(self._sizes.values()) > self.max_bytes:
+            key, _ = self._retrievers.popitem(last=False)
+            self._sizes.pop(key, None)
+            print(f"Evicted PDF index {key[:12]} from memory")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "documents": len(self._retrievers),
+                "memory_bytes": sum(self._sizes.values()),
+                "max_bytes": self.max_bytes,
+            }
@@ -0,0 +1,112 @@
+import re
+from datetime import datetime, timezone
+from typing import Dict, List, NamedTuple, Optional, Sequence
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from rag_engine.lexical_index import tokenize
+from rag_engine.quality_filtering import default_index, registered_domain, to_timestamp
+
+# Hosts that never serve an extractable article
+NON_ARTICLE_DOMAINS = frozenset({
+    "youtube.com", "youtu.be", "vimeo.com", "tiktok.com", "instagram.com", "facebook.com",
+    "x.com", "twitter.com", "pinterest.com", "linkedin.com", "reddit.com",
+})
+# Path segments of listing, media and profile pages
+NON_ARTICLE_SEGMENTS = frozenset({
+    "video", "videos", "watch", "tag", "tags", "topic", "topics", "category", "categories",
+    "author", "authors", "profile", "search", "gallery", "galleries", "photos", "podcast", "podcasts",
+})
+_MEDIA_EXTENSION = re.compile(r"\.(?:mp4|mp3|m3u8|jpe?g|png|gif|zip)$", re.I)
+# /2024/05/12/, /2024/05/ or a slug ending -2024-05-12 in article URLs
+_URL_DATE = re.compile(r"[/-](20\d{2})[/-](0?[1-9]|1[0-2])(?:[/-](0?[1-9]|[12]\d|3[01]))?(?=[/-]|$)")
+
+
+class SearchCandidate(NamedTuple):
+    """A search result scored before download."""
+    url: str
+    title: str
+    snippet: str
+    domain_score: float
+    relevance: float
+    recency: float
+    score: float
+    # False for video, tag, listing and home pages
+    article: bool
+
+
+def is_article_url(url: str) -> bool:
+    """Whether `url` looks like it points to a single article."""
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or registered_domain(url) in NON_ARTICLE_DOMAINS:
+        return False
+    path = parts.path.strip("/")
+    if not path or _MEDIA_EXTENSION.search(path):
+        return False
+    return not any(segment.lower() in NON_ARTICLE_SEGMENTS for segment in path.split("/"))
+
+
+def url_date(url: str) -> Optional[str]:
+    """ISO date embedded in an article URL path, if any."""
+    match = _URL_DATE.search(urlsplit(url).path)
+    if not match:
+        return None
+    year, month, day = match.group(1), int(match.group(2)), int(match.group(3) or 1)
+    return f"{year}-{month:02d}-{day:02d}"
+
+
+def rank_search_results(query: str, results: Sequence[Dict], index=None, now: Optional[float] = None,
+                        weights=(0.4, 0.4, 0.2), window_days: float = 10.0) -> List[SearchCandidate]:
+    """Score search results from their URL, title, snippet and date, best first.
+
+    The score is a weighted sum of the domain's credibility weight, the
+    share of query terms found in the title and snippet, and recency
+    (1.0 today, falling to 0 after `window_days`; 0.5 when no date is
+    given). Non-article pages are ranked after every article. Duplicate
+    URLs are kept once.
+    """
+    index = index or default_index()
+    now = datetime.now(timezone.utc).timestamp() if now is None else now
+    terms = set(tokenize(query))
+    candidates, seen = [], set()
+    for result in results:
+        # DDGS text results use href/body, news results url/excerpt
+        url = result.get("href") or result.get("url")
+        if not url or url in seen:
+            continue
+        seen.add(url)
+        title = result.get("title") or ""
+        snippet = result.get("body") or result.get("excerpt") or ""
+
+        domain_score = index.score_url(url)
+        domain_score = index.default if domain_score is None else domain_score
+        relevance = len(terms & set(tokenize(f"{title} {snippet}"))) / len(terms) if terms else 0.0
+        published = to_timestamp(result.get("date") or url_date(url))
+        if np.isnan(published):
+            recency = 0.5
+        else:
+            recency = float(np.clip(1.0 - max(now - published, 0.0) / 86400.0 / window_days, 0.0, 1.0))
+
+        score = weights[0] * domain_score + weights[1] * relevance + weights[2] * recency
+        candidates.append(SearchCandidate(url, title, snippet, domain_score, relevance, recency, score,
+                                          is_article_url(url)))
+    return sorted(candidates, key=lambda c: (c.article, c.score), reverse=True)
+
+
+def select_urls(candidates: Sequence[SearchCandidate], n: int = 5, per_domain: int = 2) -> List[str]:
+    """The best `n` article URLs, at most `per_domain` from one site unless there aren't enough others.
+
+    Non-article pages are only chosen when nothing else was found.
+    """
+    articles = [c for c in candidates if c.article] or list(candidates)
+    chosen, overflow, per = [], [], {}
+    for candidate in articles:
+        domain = registered_domain(candidate.url)
+        if per.get(domain, 0) < per_domain:
+            per[domain] = per.get(domain, 0) + 1
+            chosen.append(candidate)
+        else:
+            overflow.append(candidate)
+    chosen = (chosen + overflow)[:n]
+    return [c.url for c in sorted(chosen, key=lambda c: c.score, reverse=True)]
@@ -0,0 +1,20 @@
+from langchain_core.prompts import ChatPromptTemplate
+
+# Bundled copy of the LangChain Hub prompt "rlm/rag-prompt", so starting a
+# pipeline needs no network round trip to the hub.
+RAG_PROMPT_TEMPLATE = (
+    "You are an assistant for question-answering tasks. Use the following pieces of retrieved context "
+    "to answer the question. If you don't know the answer, just say that you don't know. Use three "
+    "sentences maximum and keep the answer concise.\n"
+    "Question: {question} \n"
+    "Context: {context} \n"
+    "Answer:"
+)
+
+BUNDLED_PROMPTS = {
+    "rlm/rag-prompt": RAG_PROMPT_TEMPLATE,
+}
+
+
+def bundled_prompt(name: str = "rlm/rag-prompt") -> ChatPromptTemplate:
+    return ChatPromptTemplate.from_messages([("human", BUNDLED_PROMPTS[name])])
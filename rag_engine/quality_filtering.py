@@ -1,61 +1,151 @@
-from datetime import datetime
+import json
+import os
+from datetime import datetime, timezone
+
+import numpy as np
+from dateutil.parser import parse as date_parse
+
+from rag_engine import domains
+
+DEFAULT_TABLE_PATH = os.path.join(os.path.dirname(__file__), "data", "domain_credibility.json")
+
+
+def registered_domain(url):
+    """'https://www.bbc.co.uk/news/x' -> 'bbc.co.uk'"""
+    ext = domains.extract(url)
+    return f"{ext.domain}.{ext.suffix}".lower() if ext.domain and ext.suffix else None
 
-def credibility_scores(results):
-    """Filter for reputable news sources and assign quality scores."""
-    
-    reputable_domains = {
-        'reuters', 'ap', 'bbc', 'cnn', 'hindustantimes', 'hindu', 'livemint',
-        'nytimes', 'wsj', 'bloomberg', 'techcrunch', 'arstechnica', 'timesofindia', 'forbes',
-        'theverge', 'wired', 'theguardian', 'economist', 'financialtimes', 'npr',
-        'cnbc', 'axios', 'politico', 'nbcnews', 'thehill', 'vox', 'buzzfeednews',
-        'ndtv'
-    }
-
-    scores = []
-    for result in results:
-        domain_score = 0.5  # Default score
-        content_score = 0.0
-
-        # --- Domain score ---
-        domain = result.metadata.get('domain')
-        if domain:
-            if any(rep in domain.lower() for rep in reputable_domains):
-                domain_score = 1.0
-            else:
-                domain_score = 0.5
-        else:
-            print("⚠️ Domain missing for one of the documents")
 
-        # --- Content + recency score ---
+class DomainCredibilityIndex:
+    """Exact-match lookup of per-domain credibility weights.
+
+    Documents are matched on the registered domain of their `source` URL
+    (so 'ap' no longer matches every domain containing those letters).
+    Documents without a source fall back to an exact match of the
+    `domain` label (e.g. 'reuters') against the table's registered domains.
+    """
+
+    def __init__(self, weights, default=0.5):
+        self.default = default
+        self.weights = {domain.lower(): float(weight) for domain, weight in weights.items()}
+        self.labels = {}
+        for domain, weight in self.weights.items():
+            label = domain.split(".")[0]
+            self.labels[label] = max(weight, self.labels.get(label, 0.0))
+        self._host_cache = {}
+
+    @classmethod
+    def load(cls, path=None):
+        """Load a table of the form {"default": 0.5, "domains": {"reuters.com": 1.0, ...}}."""
+        with open(path or os.getenv("FACTSIFT_DOMAIN_TABLE", DEFAULT_TABLE_PATH), encoding="utf-8") as f:
+            table = json.load(f)
+        return cls(table["domains"], default=table.get("default", 0.5))
+
+    def score_url(self, url):
+        # Keyed by host, not URL: the score depends only on the domain, and hosts stay few
+        parts = url.split("/", 3)
+        host = parts[2] if len(parts) > 2 else url
         try:
-            if result.metadata.get('publish_date'):
-                days_old = (datetime.now() - result.metadata['publish_date'].replace(tzinfo=None)).days
-                content_score += max(0, 10 - days_old)  # Recent articles = higher score
-        except Exception:
-            print("⚠️ Missing or invalid publish date")
+            return self._host_cache[host]
+        except KeyError:
+            domain = registered_domain(url)
+            score = self._host_cache[host] = self.weights.get(domain) if domain else None
+            return score
 
-        length = len(result.page_content)
-        if 200 < length < 5000:
-            content_score += 3
+    def score(self, metadata):
+        """Credibility weight for a document's metadata, or None if it has no domain at all."""
+        source = metadata.get("source")
+        if source and source.startswith("http"):
+            # Unlisted domains get the default: falling back to the label would give bbc.xyz bbc.com's weight
+            score = self.score_url(source)
+            return self.default if score is None else score
+        label = metadata.get("domain")
+        if label:
+            return self.labels.get(label.lower(), self.default)
+        return self.default if source else None
 
-        # Store raw content score
-        result.metadata['content_score'] = content_score
-        scores.append(content_score)
 
-        # Temporarily store domain credibility
-        result.metadata['domain_score'] = domain_score
+_default_index = None
+
+def default_index():
+    global _default_index
+    if _default_index is None:
+        _default_index = DomainCredibilityIndex.load()
+    return _default_index
+
+
+def to_timestamp(value):
+    """POSIX timestamp for an ISO date string or datetime; naive values are taken as UTC."""
+    if not value:
+        return np.nan
+    try:
+        if isinstance(value, datetime):
+            parsed = value
+        else:
+            try:
+                parsed = datetime.fromisoformat(value)
+            except ValueError:
+                parsed = date_parse(value)
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed.timestamp()
+    except (TypeError, ValueError, OverflowError):
+        return np.nan
+
+
+def score_arrays(domain_scores, publish_ts, lengths, now=None):
+    """Columnar quality scoring.
+
+    Takes arrays of domain weights, publish timestamps (NaN when unknown)
+    and text lengths, and returns (content_scores, quality_scores).
+    """
+    now = datetime.now(timezone.utc).timestamp() if now is None else now
+    days_old = np.floor((now - publish_ts) / 86400.0)
+    # Recent articles = higher score; future dates count as today
+    recency = np.where(np.isnan(days_old), 0.0, np.maximum(0.0, 10.0 - np.maximum(days_old, 0.0)))
+    content = recency + np.where((lengths > 200) & (lengths < 5000), 3.0, 0.0)
 
     # --- Normalize content scores ---
-    if scores:
-        max_score = max(scores)
-        norm_scores = [s / max_score if max_score > 0 else 0 for s in scores]
-    else:
-        print("⚠️ No valid content scores. Assigning default quality_score = 0.5")
-        norm_scores = [0.5 for _ in results]
+    max_score = content.max() if content.size else 0.0
+    norm = content / max_score if max_score > 0 else np.zeros_like(content)
 
     # --- Final quality score ---
+    return content, 0.5 * domain_scores + 0.5 * norm
+
+
+def credibility_scores(results, index=None, now=None):
+    """Filter for reputable news sources and assign quality scores."""
+    if not results:
+        print("⚠️ No valid content scores. Assigning default quality_score = 0.5")
+        return []
+    index = index or default_index()
+
+    # --- Gather columns in one pass ---
+    domain_scores = np.empty(len(results))
+    publish_ts = np.empty(len(results))
+    lengths = np.empty(len(results))
+    missing_domain = missing_date = 0
     for i, result in enumerate(results):
-        final_score = 0.5 * result.metadata.get('domain_score', 0.5) + 0.5 * norm_scores[i]
-        result.metadata['quality_score'] = final_score
+        score = index.score(result.metadata)
+        if score is None:
+            missing_domain += 1
+            score = index.default
+        domain_scores[i] = score
+        publish_ts[i] = to_timestamp(result.metadata.get("publish_date"))
+        missing_date += np.isnan(publish_ts[i])
+        lengths[i] = len(result.page_content)
+
+    if missing_domain:
+        print(f"⚠️ Domain missing for {missing_domain} of the documents")
+    if missing_date:
+        print(f"⚠️ Missing or invalid publish date for {int(missing_date)} of the documents")
+
+    content_scores, quality_scores = score_arrays(domain_scores, publish_ts, lengths, now)
+
+    for result, domain_score, content_score, quality_score in zip(results, domain_scores, content_scores, quality_scores):
+        result.metadata['domain_score'] = float(domain_score)
+        result.metadata['content_score'] = float(content_score)
+        result.metadata['quality_score'] = float(quality_score)
 
-    return sorted(results, key=lambda x: x.metadata['quality_score'], reverse=True)
\ No newline at end of file
+    order = np.argsort(-quality_scores, kind="stable")
+    return [results[i] for i in order]
@@ -0,0 +1,93 @@
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional
+
+
+def normalize_query(query: str) -> str:
+    """Case-, punctuation- and whitespace-insensitive form of a query."""
+    return " ".join(re.sub(r"[^\w\s]", " ", query.lower()).split())
+
+
+class TTLCache:
+    """Thread-safe LRU mapping whose entries expire `ttl` seconds after being set."""
+
+    def __init__(self, ttl: float, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] < time.monotonic():
+                self._data.pop(key, None)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        return {"entries": len(self._data), "hits": self.hits, "misses": self.misses, "ttl": self.ttl}
+
+
+class QueryCache:
+    """Tiered cache for the news pipeline.
+
+    - answers: final answers per normalized query and chat history
+    - searches: search result URLs per normalized query
+    - documents: scraped Documents per URL
+
+    Each tier has its own TTL so answers go stale quickly while article
+    bodies, which rarely change once published, are kept longer.
+    """
+
+    def __init__(self, answer_ttl: float = 5 * 60, search_ttl: float = 15 * 60,
+                 document_ttl: float = 60 * 60, max_entries: int = 1024):
+        self.answers = TTLCache(answer_ttl, max_entries)
+        self.searches = TTLCache(search_ttl, max_entries)
+        self.documents = TTLCache(document_ttl, 4 * max_entries)
+
+    @staticmethod
+    def answer_key(query: str, chat_history: Optional[List[dict]] = None, variant: str = "") -> str:
+        """Key for an answer; `variant` covers whatever else it depends on (pipeline settings, selection)."""
+        history = json.dumps(chat_history or [], sort_keys=True, default=str)
+        return f"{normalize_query(query)}|{hashlib.sha256(history.encode('utf-8')).hexdigest()}|{variant}"
+
+    def clear(self):
+        self.answers.clear()
+        self.searches.clear()
+        self.documents.clear()
+
+    def stats(self) -> dict:
+        return {
+            "answers": self.answers.stats(),
+            "searches": self.searches.stats(),
+            "documents": self.documents.stats(),
+        }
+
+
+# Shared by every pipeline in the process, so sessions benefit from each other
+query_cache = QueryCache()
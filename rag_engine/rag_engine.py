@@ -1,83 +1,448 @@
+import asyncio
+import concurrent.futures
+import contextlib
+import hashlib
+import json
 import os
+import queue
+import threading
+import time
 from dotenv import load_dotenv
-from typing import List, Tuple
+from typing import Callable, Iterator, List, Optional, Tuple
 
 from langchain_core.documents import Document
-from langchain.chat_models import init_chat_model
-from langchain_openai import OpenAIEmbeddings
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_core.vectorstores import InMemoryVectorStore
-from langchain import hub
 
-from rag_engine.google_news_links import simple_google_search
+from rag_engine.google_news_links import search_results
+from rag_engine.prefetch_filter import rank_search_results, select_urls
 from rag_engine.quality_filtering import credibility_scores
 from rag_engine.news_article import load_web_content_hybrid
+from rag_engine.fetch_pool import fetch_all
+from rag_engine.clients import shared_clients
+from rag_engine.session_store import SessionVectorStore
+from rag_engine.vector_index import NumpyVectorStore
+from rag_engine.query_cache import QueryCache, normalize_query, query_cache
+from rag_engine.tracing import QueryTrace, finish_trace
+from rag_engine.fusion import ScoredChunk, fuse_scores, reciprocal_rank_fusion
+from rag_engine.context_packer import pack_context, pack_history
+from rag_engine.chunking import NEWS_PROFILE, Chunk, iter_chunks
+from rag_engine.dedup import NearDuplicateIndex, deduplicate, default_index as default_dedup_index
 
 load_dotenv()
-os.environ["LANGSMITH_TRACING"] = "true"
-os.environ["LANGSMITH_API_KEY"] = os.getenv("LANGSMITH-KEY")
-os.environ["OPENAI_API_KEY"] = os.getenv("OPENAI-KEY")
+# LangSmith is optional; built-in tracing (rag_engine.tracing) works offline
+if os.getenv("LANGSMITH-KEY"):
+    os.environ.setdefault("LANGSMITH_TRACING", "true")
+    os.environ["LANGSMITH_API_KEY"] = os.getenv("LANGSMITH-KEY")
+if os.getenv("OPENAI-KEY"):
+    os.environ["OPENAI_API_KEY"] = os.getenv("OPENAI-KEY")
 
 class RAGPipeline:
-    def __init__(self):
-        self.llm = init_chat_model("gpt-4.1", model_provider="openai")
-        self.embeddings = OpenAIEmbeddings(model="text-embedding-3-large")
-        self.vector_store = InMemoryVectorStore(self.embeddings)
-        self.prompt = hub.pull("rlm/rag-prompt")
-
-    def load_documents(self, query: str) -> List[Document]:
-        urls = simple_google_search(query, 5)
-        docs = []
-        for url in urls:
-            try:
-                docs.append(load_web_content_hybrid(url))
-            except Exception as e:
-                print(f"[Error loading {url}]: {e}")
-            docs.append(load_web_content_hybrid(url))
-        credibility_scores(docs)
-        return docs
+    def __init__(self, max_chunks: int = 5000, ttl_seconds: float = 6 * 3600, scope: str = "query",
+                 cache: Optional[QueryCache] = None, llm=None, embeddings=None, prompt=None,
+                 prewarmed_index: Optional[str] = None, dedup_index: Optional[NearDuplicateIndex] = None,
+                 context_tokens: int = 3000, history_tokens: int = 1500, hybrid: bool = True,
+                 prefilter: Optional[int] = 200, search_results: int = 15, fetch_count: int = 5):
+        # scope="query" searches only chunks fetched for the current query,
+        # scope="session" searches everything this pipeline has indexed
+        self.scope = scope
+        # Over-fetch search results, which are cheap, and download only the best `fetch_count`
+        self.search_results = search_results
+        self.fetch_count = fetch_count
+        self.cache = cache or query_cache
+        # Clients come from the process-wide pool; only the vector store is per pipeline
+        clients = shared_clients()
+        # stream_usage reports token counts on streamed responses for tracing
+        self.llm = llm or clients.chat_model("gpt-4.1", stream_usage=True)
+        self.embeddings = embeddings or clients.embeddings("text-embedding-3-large")
+        # hybrid=True keeps a BM25 index next to the vectors for exact names, tickers and numbers
+        self.hybrid = hybrid
+        self.prefilter = prefilter
+        self.vector_store = SessionVectorStore(self.embeddings, max_chunks=max_chunks, ttl_seconds=ttl_seconds,
+                                               lexical=hybrid)
+        # Article fingerprints persist across queries (and processes) to collapse syndicated copies
+        self.dedup_index = default_dedup_index() if dedup_index is None else dedup_index
+        # Read-only index built ahead of time by `python main.py ingest`
+        self.prewarmed = None
+        if prewarmed_index and os.path.exists(prewarmed_index):
+            self.prewarmed = NumpyVectorStore.load(prewarmed_index, self.embeddings, approximate=True, lexical=hybrid)
+            print(f"📚 Loaded {len(self.prewarmed)} pre-indexed chunks from {prewarmed_index}")
+        self.prompt = prompt or clients.prompt("rlm/rag-prompt")
+        # Prompt budgets (approximate tokens) so prompt size stays flat over a long chat
+        self.context_tokens = context_tokens
+        self.history_tokens = history_tokens
+        self.fingerprint = self._config_fingerprint(prewarmed_index)
+
+    def _config_fingerprint(self, prewarmed_index: Optional[str]) -> str:
+        """Hash of the settings answers depend on, so the process-wide answer cache never mixes pipelines."""
+        prewarmed = None
+        if self.prewarmed is not None:
+            stat = os.stat(prewarmed_index)
+            prewarmed = [os.path.abspath(prewarmed_index), stat.st_mtime, stat.st_size]
+        config = [
+            type(self.llm).__name__, getattr(self.llm, "_identifying_params", None), repr(self.prompt),
+            getattr(self.embeddings, "model", type(self.embeddings).__name__), prewarmed, self.scope,
+            self.context_tokens, self.history_tokens, self.hybrid, self.prefilter, self.search_results,
+            self.fetch_count,
+        ]
+        return hashlib.sha256(json.dumps(config, default=str).encode("utf-8")).hexdigest()[:16]
+
+    def answer_key(self, query: str, chat_history: List[dict], selection: Optional[dict] = None) -> str:
+        """Answer cache key for `query` under this pipeline's settings and the given selection options."""
+        variant = f"{self.fingerprint}|{sorted((selection or {}).items())!r}"
+        return self.cache.answer_key(query, chat_history, variant)
+
+    def search(self, query: str, force_refresh: bool = False, trace: Optional[QueryTrace] = None) -> List[str]:
+        trace = trace or QueryTrace()
+        key = normalize_query(query)
+        urls = None if force_refresh else self.cache.searches.get(key)
+        if urls is None:
+            with trace.stage("search"):
+                results = search_results(query, self.search_results)
+            with trace.stage("prefetch_filter"):
+                urls = select_urls(rank_search_results(query, results), self.fetch_count)
+            trace.incr("search.results", len(results))
+            trace.incr("search.skipped", len(results) - len(urls))
+            self.cache.searches.set(key, urls)
+        else:
+            trace.incr("cache.search_hits")
+        return list(urls)
+
+    def load_url(self, url: str, force_refresh: bool = False, trace: Optional[QueryTrace] = None) -> Document:
+        trace = trace or QueryTrace()
+        doc = None if force_refresh else self.cache.documents.get(url)
+        if doc is None:
+            # A forced refresh still revalidates cheaply when the server supports it
+            doc = load_web_content_hybrid(url, revalidate=force_refresh)
+            self.cache.documents.set(url, doc)
+            trace.incr("bytes_downloaded", doc.metadata.get("downloaded_bytes", doc.metadata.get("content_bytes", 0)))
+            if doc.metadata.get("http_cache"):
+                trace.incr(f"cache.http_{doc.metadata['http_cache']}")
+            for attempt in doc.metadata.get("extraction_attempts", []):
+                trace.record_stage(f"extract.{attempt['method']}", attempt["seconds"])
+        else:
+            trace.incr("cache.document_hits")
+        # Scoring and splitting write to metadata, so never hand out the cached object
+        return Document(page_content=doc.page_content, metadata=dict(doc.metadata))
+
+    def load_documents(self, query: str, deadline: float = 20.0, force_refresh: bool = False,
+                       on_progress: Optional[Callable[[dict], None]] = None,
+                       trace: Optional[QueryTrace] = None) -> List[Document]:
+        trace = trace or QueryTrace()
+        urls = self.search(query, force_refresh=force_refresh, trace=trace)
+        if on_progress:
+            on_progress({"type": "stage", "stage": "searched", "total": len(urls)})
+
+        fetched = []
+        def on_result(url, doc):
+            fetched.append(url)
+            if on_progress:
+                on_progress({"type": "stage", "stage": "fetched", "done": len(fetched), "total": len(urls)})
+
+        with trace.stage("fetch"):
+            docs = fetch_all(urls, lambda url: self.load_url(url, force_refresh, trace), max_workers=8, per_host=2,
+                             deadline=deadline, on_result=on_result)
+        trace.incr("urls", len(urls))
+        trace.incr("documents", len(docs))
+        with trace.stage("credibility"):
+            docs = credibility_scores(docs)
+        with trace.stage("dedup"):
+            kept = deduplicate(docs, self.dedup_index)
+        trace.incr("duplicates_removed", len(docs) - len(kept))
+        return kept
+
+    def namespace_for(self, query: str) -> Optional[str]:
+        return normalize_query(query) if self.scope == "query" else None
 
-    def index_documents(self, docs: List[Document]):
-        splitter = RecursiveCharacterTextSplitter(chunk_size=800, chunk_overlap=200, add_start_index=True)
-        chunks = splitter.split_documents(docs)
-        self.vector_store.add_documents(documents=chunks)
+    def index_documents(self, docs: List[Document], namespace: Optional[str] = None,
+                        trace: Optional[QueryTrace] = None) -> int:
+        trace = trace or QueryTrace()
+        # Stable ids so re-indexing a cached article replaces its chunks instead of duplicating them
+        def chunk_id(chunk: Chunk) -> str:
+            return hashlib.sha1(f"{namespace}|{chunk.metadata.get('source')}|{chunk.start_index}".encode("utf-8")).hexdigest()
 
-    def retrieve_context(self, question: str, top_k: int = 10) -> List[Tuple[Document, float]]:
-        return self.vector_store.similarity_search_with_score(question, k=top_k)
+        # The embedding cache is shared by all sessions, so count only this call's lookups
+        counting = getattr(self.embeddings, "counting", None)
+        # Chunks are produced lazily and embedded in batches as they come
+        with trace.stage("embed"), (counting() if counting else contextlib.nullcontext({})) as counts:
+            ids = self.vector_store.add_chunks(iter_chunks(docs, NEWS_PROFILE), chunk_id, namespace=namespace)
+        trace.incr("chunks_indexed", len(ids))
+        trace.incr("cache.embedding_hits", counts.get("hits", 0))
+        trace.incr("cache.embedding_misses", counts.get("misses", 0))
+        return len(ids)
 
-    def score_and_select_context(self, context: List[Tuple[Document, float]], top_n: int = 3) -> List[Tuple[Document, float]]:
-        for doc, sim_score in context:
-            quality = doc.metadata.get("quality_score", 0.5)
-            doc.metadata["final_score"] = 0.8 * sim_score + 0.2 * quality
-        return sorted(context, key=lambda x: x[0].metadata["final_score"], reverse=True)[:top_n]
+    # Below this many searchable chunks the dense search is cheap enough to run on everything
+    PREFILTER_MIN_SIZE = 2000
 
-    def generate_answer(self, question: str, context: List[Tuple[Document, float]], chat_history: List[dict]) -> str:
-        docs_content = "\n\n".join([doc.page_content for doc, _ in context])
+    def retrieve_context(self, question: str, top_k: int = 10, namespace: Optional[str] = None,
+                         trace: Optional[QueryTrace] = None) -> List[Tuple[Document, float]]:
+        """Best `top_k` candidates for `question` with their relevance scores.
+
+        With hybrid retrieval, dense and BM25 rankings are merged by
+        reciprocal rank fusion, and the scores are fused relevance in
+        (0, 1] rather than cosine similarities. In stores of more than
+        PREFILTER_MIN_SIZE chunks, the dense search only scores the
+        `prefilter` best lexical matches, provided there are at least top_k.
+        """
+        trace = trace or QueryTrace()
+        stores = [(self.vector_store, self.vector_store.ids_in(namespace))]
+        if self.prewarmed is not None:
+            stores.append((self.prewarmed, None))
+
+        lexical, candidates = [], None
+        if self.hybrid:
+            searchable = sum(len(store) if ids is None else len(ids) for store, ids in stores)
+            prefilter = self.prefilter if self.prefilter and searchable > self.PREFILTER_MIN_SIZE else 0
+            with trace.stage("lexical_search"):
+                for store, ids in stores:
+                    lexical += store.lexical_search_with_score(question, k=max(top_k, prefilter), ids=ids)
+                lexical.sort(key=lambda x: x[1], reverse=True)
+            if prefilter and len(lexical) >= top_k:
+                candidates = [doc.id for doc, _ in lexical]
+                trace.incr("lexical_prefiltered")
+            lexical = lexical[:top_k]
+
+        with trace.stage("vector_search"):
+            if self.prewarmed is None:
+                dense = self.vector_store.similarity_search_with_score(question, k=top_k, namespace=namespace,
+                                                                       ids=candidates)
+            else:
+                embedding = self.embeddings.embed_query(question)
+                dense = []
+                for store, ids in stores:
+                    dense += store.similarity_search_with_score_by_vector(
+                        embedding, k=top_k, ids=ids if candidates is None else candidates)
+                dense = sorted(dense, key=lambda x: x[1], reverse=True)[:top_k]
+
+        if not self.hybrid:
+            return dense
+        trace.incr("lexical_only_candidates", len({d.id for d, _ in lexical} - {d.id for d, _ in dense}))
+        return reciprocal_rank_fusion([dense, lexical], top_k=top_k)
+
+    def _vectors_for(self, docs: List[Document]):
+        """Stored embeddings for retrieved chunks, or None if any is missing."""
+        stores = [self.vector_store] + ([self.prewarmed] if self.prewarmed is not None else [])
+        vectors = []
+        for doc in docs:
+            for store in stores:
+                try:
+                    vectors.append(store.get_vectors([doc.id])[0])
+                    break
+                except KeyError:
+                    continue
+            else:
+                return None
+        return vectors
+
+    def score_and_select_context(self, context: List[Tuple[Document, float]], top_n: int = 3, alpha: float = 0.8,
+                                 beta: float = 0.2, gamma: float = 0.0, mmr_lambda: Optional[float] = None) -> List[ScoredChunk]:
+        """Fuse similarity, quality and (optionally) recency, then pick top_n.
+
+        Returns immutable ScoredChunk records; chunk metadata, which is shared
+        between concurrent queries, is left untouched. Set mmr_lambda (e.g. 0.7)
+        to trade some score for diversity between the selected chunks.
+        """
+        vectors = self._vectors_for([doc for doc, _ in context]) if mmr_lambda is not None else None
+        return fuse_scores(context, top_n=top_n, alpha=alpha, beta=beta, gamma=gamma,
+                           mmr_lambda=mmr_lambda, vectors=vectors)
+
+    def build_messages(self, question: str, context: List[ScoredChunk], chat_history: List[dict],
+                       trace: Optional[QueryTrace] = None) -> List[dict]:
+        """Chat messages for the LLM, packed into the context and history token budgets.
+
+        Overlapping neighbouring chunks are merged and older turns are cut
+        down or dropped (see rag_engine.context_packer); the tokens used are
+        recorded on `trace`.
+        """
+        trace = trace or QueryTrace()
+        packed = pack_context(context, self.context_tokens)
+        history = pack_history(chat_history, self.history_tokens)
+        trace.incr("tokens.context", packed.tokens)
+        trace.incr("tokens.history", history.tokens)
+        trace.incr("context_chunks_merged", packed.merged)
+        trace.incr("context_chunks_dropped", packed.dropped)
+        trace.incr("history_messages_truncated", history.truncated)
+        trace.incr("history_messages_dropped", history.dropped)
 
         # Construct messages list
-        messages = [
+        return [
             {"role": "system", "content": "You are a helpful assistant that answers questions based on news articles."}
-        ] + chat_history + [
-            {"role": "user", "content": f"Answer the following question using this context:\n\n{docs_content}\n\nQuestion: {question}"}
+        ] + history.messages + [
+            {"role": "user", "content": f"Answer the following question using this context:\n\n{packed.text}\n\nQuestion: {question}"}
         ]
 
-        response = self.llm.invoke(messages)
+    def generate_answer(self, question: str, context: List[ScoredChunk], chat_history: List[dict]) -> str:
+        response = self.llm.invoke(self.build_messages(question, context, chat_history))
+        return response.content
+
+    def stream_answer(self, question: str, context: List[ScoredChunk], chat_history: List[dict],
+                      trace: Optional[QueryTrace] = None) -> Iterator[str]:
+        """Yield the answer piece by piece as the LLM produces it."""
+        trace = trace or QueryTrace()
+        start = time.perf_counter()
+        first_token = None
+        for chunk in self.llm.stream(self.build_messages(question, context, chat_history, trace=trace)):
+            usage = getattr(chunk, "usage_metadata", None)
+            if usage:
+                trace.incr("tokens.input", usage.get("input_tokens", 0))
+                trace.incr("tokens.output", usage.get("output_tokens", 0))
+            if chunk.content:
+                if first_token is None:
+                    first_token = time.perf_counter() - start
+                    trace.record_stage("llm.first_token", first_token)
+                yield chunk.content
+        trace.record_stage("llm", time.perf_counter() - start)
+
+    async def agenerate_answer(self, question: str, context: List[ScoredChunk], chat_history: List[dict],
+                               trace: Optional[QueryTrace] = None) -> str:
+        trace = trace or QueryTrace()
+        start = time.perf_counter()
+        response = await self.llm.ainvoke(self.build_messages(question, context, chat_history, trace=trace))
+        usage = getattr(response, "usage_metadata", None)
+        if usage:
+            trace.incr("tokens.input", usage.get("input_tokens", 0))
+            trace.incr("tokens.output", usage.get("output_tokens", 0))
+        trace.record_stage("llm", time.perf_counter() - start)
         return response.content
 
 
 def initialize_rag_pipeline() -> RAGPipeline:
-    return RAGPipeline()
+    return RAGPipeline(prewarmed_index=os.getenv("FACTSIFT_PREWARMED_INDEX"))
+
+def stream_query(query: str, pipeline: RAGPipeline, chat_history: List[dict], force_refresh: bool = False,
+                 selection: Optional[dict] = None) -> Iterator[dict]:
+    """Run the pipeline, yielding events as it goes.
 
-def process_query(query: str, pipeline: RAGPipeline, chat_history: List[dict]) -> Tuple[str, List[dict]]:
-    docs = pipeline.load_documents(query)
-    print(f"📰 Loaded {len(docs)} documents.")
-    pipeline.index_documents(docs)
-    raw_context = pipeline.retrieve_context(query)
-    final_context = pipeline.score_and_select_context(raw_context)
-    answer = pipeline.generate_answer(query, final_context, chat_history)
+    Events are dicts with a "type" of:
+    - "stage": progress, with "stage" one of searched, fetched, indexed,
+      retrieved (plus counts such as "done"/"total" or "chunks")
+    - "token": a piece of the answer in "text"
+    - "done": the final "answer", "chat_history", "cached" flag and "trace"
+      (stage timings and counters, see rag_engine.tracing)
+
+    `selection` is passed to score_and_select_context (alpha, beta, gamma,
+    mmr_lambda, top_n).
+    """
+    trace = QueryTrace(query)
+    # Identical question with identical history: skip search, scraping and the LLM
+    answer_key = pipeline.answer_key(query, chat_history, selection)
+    answer = None if force_refresh else pipeline.cache.answers.get(answer_key)
+    cached = answer is not None
+
+    if cached:
+        trace.incr("cache.answer_hits")
+        yield {"type": "token", "text": answer}
+    else:
+        namespace = pipeline.namespace_for(query)
+
+        # Fetch progress is reported from worker threads, so relay it through a queue
+        events = queue.Queue()
+        result = {}
+        def load():
+            try:
+                result["docs"] = pipeline.load_documents(query, force_refresh=force_refresh,
+                                                         on_progress=events.put, trace=trace)
+            except Exception as e:
+                result["error"] = e
+            finally:
+                events.put(None)
+        threading.Thread(target=load, daemon=True).start()
+        for event in iter(events.get, None):
+            yield event
+        if "error" in result:
+            raise result["error"]
+        docs = result["docs"]
+        print(f"📰 Loaded {len(docs)} documents.")
+
+        chunks = pipeline.index_documents(docs, namespace=namespace, trace=trace)
+        yield {"type": "stage", "stage": "indexed", "documents": len(docs), "chunks": chunks}
+        raw_context = pipeline.retrieve_context(query, namespace=namespace, trace=trace)
+        with trace.stage("rerank"):
+            final_context = pipeline.score_and_select_context(raw_context, **(selection or {}))
+        trace.incr("context_chunks", len(final_context))
+        yield {"type": "stage", "stage": "retrieved", "chunks": len(final_context)}
+
+        parts = []
+        for token in pipeline.stream_answer(query, final_context, chat_history, trace=trace):
+            parts.append(token)
+            yield {"type": "token", "text": token}
+        answer = "".join(parts)
+        pipeline.cache.answers.set(answer_key, answer)
 
     # Append user and assistant turn
     chat_history.append({"role": "user", "content": query})
     chat_history.append({"role": "assistant", "content": answer})
 
-    return {"answer": answer, "chat_history": chat_history}
\ No newline at end of file
+    yield {"type": "done", "answer": answer, "chat_history": chat_history, "cached": cached,
+           "trace": finish_trace(trace)}
+
+def process_query(query: str, pipeline: RAGPipeline, chat_history: List[dict], force_refresh: bool = False,
+                  selection: Optional[dict] = None) -> Tuple[str, List[dict]]:
+    for event in stream_query(query, pipeline, chat_history, force_refresh=force_refresh, selection=selection):
+        if event["type"] == "done":
+            return {"answer": event["answer"], "chat_history": event["chat_history"], "cached": event["cached"],
+                    "trace": event["trace"]}
+
+
+# Identical queries currently running, shared across threads and event loops
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+async def _arun_query(query: str, pipeline: RAGPipeline, chat_history: List[dict], force_refresh: bool,
+                      selection: Optional[dict]) -> dict:
+    trace = QueryTrace(query)
+    answer_key = pipeline.answer_key(query, chat_history, selection)
+    answer = None if force_refresh else pipeline.cache.answers.get(answer_key)
+    cached = answer is not None
+
+    if cached:
+        trace.incr("cache.answer_hits")
+    else:
+        namespace = pipeline.namespace_for(query)
+        # Scraping, embedding and vector search block, so they run on worker threads
+        docs = await asyncio.to_thread(pipeline.load_documents, query, force_refresh=force_refresh, trace=trace)
+        await asyncio.to_thread(pipeline.index_documents, docs, namespace=namespace, trace=trace)
+        raw_context = await asyncio.to_thread(pipeline.retrieve_context, query, namespace=namespace, trace=trace)
+        with trace.stage("rerank"):
+            final_context = pipeline.score_and_select_context(raw_context, **(selection or {}))
+        trace.incr("context_chunks", len(final_context))
+        answer = await pipeline.agenerate_answer(query, final_context, chat_history, trace=trace)
+        pipeline.cache.answers.set(answer_key, answer)
+
+    return {"answer": answer, "cached": cached, "trace": finish_trace(trace)}
+
+async def aprocess_query(query: str, pipeline: RAGPipeline, chat_history: List[dict], force_refresh: bool = False,
+                         selection: Optional[dict] = None) -> dict:
+    """Async process_query for serving many users from one process.
+
+    Unlike process_query, the caller's chat_history is not modified; the
+    returned "chat_history" is a new list with this turn appended, so
+    concurrent requests of one session cannot interleave their turns.
+
+    Identical requests (same pipeline, question, history and options)
+    that arrive while one is already running wait for its result instead
+    of running again; their result has "coalesced" set. Requests from
+    different pipelines are never merged: each must index the documents
+    into its own session store for follow-up questions.
+    """
+    chat_history = list(chat_history)
+    key = (id(pipeline), pipeline.answer_key(query, chat_history, selection), force_refresh)
+    with _inflight_lock:
+        shared = _inflight.get(key)
+        coalesced = shared is not None
+        if not coalesced:
+            shared = _inflight[key] = concurrent.futures.Future()
+
+    if coalesced:
+        result = await asyncio.wrap_future(shared)
+    else:
+        try:
+            result = await _arun_query(query, pipeline, chat_history, force_refresh, selection)
+            shared.set_result(result)
+        except BaseException as e:
+            shared.set_exception(e)
+            raise
+        finally:
+            with _inflight_lock:
+                _inflight.pop(key, None)
+
+    chat_history += [{"role": "user", "content": query}, {"role": "assistant", "content": result["answer"]}]
+    return {**result, "chat_history": chat_history, "coalesced": coalesced}
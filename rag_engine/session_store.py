@@ -0,0 +1,143 @@
+import time
+from collections import OrderedDict, defaultdict
+from datetime import datetime, timezone
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from rag_engine.chunking import Chunk
+from rag_engine.vector_index import NumpyVectorStore
+
+
+def _timestamp(value) -> Optional[float]:
+    """Parse an ISO `scraped_at` value into a POSIX timestamp."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is None:
+        # extract_metadata_extruct stores naive UTC timestamps
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+class SessionVectorStore(NumpyVectorStore):
+    """NumpyVectorStore with namespaces and bounded size.
+
+    Chunks are added under a namespace (e.g. one per query or per session)
+    and searches can be restricted to one. Chunks older than `ttl_seconds`,
+    measured from their `scraped_at` metadata, are dropped, and once the
+    store holds more than `max_chunks` the least recently used chunks are
+    evicted.
+    """
+
+    def __init__(self, embedding: Embeddings, max_chunks: int = 5000, ttl_seconds: Optional[float] = 6 * 3600,
+                 **kwargs):
+        super().__init__(embedding, **kwargs)
+        self.max_chunks = max_chunks
+        self.ttl_seconds = ttl_seconds
+        self.evicted = 0
+        # id -> (namespace, added_at), ordered from least to most recently used
+        self._entries = OrderedDict()
+        self._namespaces = defaultdict(set)
+
+    def add_documents(self, documents: List[Document], ids: Optional[List[str]] = None,
+                      namespace: Optional[str] = None, **kwargs) -> List[str]:
+        for doc in documents:
+            doc.metadata["namespace"] = namespace
+        new_ids = super().add_documents(documents, ids=ids, **kwargs)
+        self._track(new_ids, [doc.metadata for doc in documents], namespace)
+        return new_ids
+
+    def add_chunks(self, chunks: Iterable[Chunk], chunk_id: Optional[Callable[[Chunk], str]] = None,
+                   batch_size: int = 64, namespace: Optional[str] = None) -> List[str]:
+        def tagged():
+            for chunk in chunks:
+                # Shared by the document's chunks, which all go into the same namespace
+                chunk.metadata["namespace"] = namespace
+                yield chunk
+        new_ids = super().add_chunks(tagged(), chunk_id, batch_size)
+        with self._lock:
+            metadatas = [self._metadatas[self._rows[doc_id]] for doc_id in new_ids]
+        self._track(new_ids, metadatas, namespace)
+        return new_ids
+
+    def _track(self, ids: List[str], metadatas: List[dict], namespace: Optional[str]):
+        now = time.time()
+        with self._lock:
+            for doc_id, metadata in zip(ids, metadatas):
+                added_at = _timestamp(metadata.get("scraped_at")) or now
+                self._entries[doc_id] = (namespace, added_at)
+                self._entries.move_to_end(doc_id)
+                self._namespaces[namespace].add(doc_id)
+            self.evict()
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs) -> None:
+        with self._lock:
+            super().delete(ids, **kwargs)
+            for doc_id in ids or []:
+                entry = self._entries.pop(doc_id, None)
+                if entry is not None:
+                    members = self._namespaces[entry[0]]
+                    members.discard(doc_id)
+                    if not members:
+                        del self._namespaces[entry[0]]
+
+    def drop_namespace(self, namespace: str) -> int:
+        with self._lock:
+            ids = list(self._namespaces.get(namespace, ()))
+            self.delete(ids)
+        return len(ids)
+
+    def ids_in(self, namespace: Optional[str]) -> Optional[List[str]]:
+        """Ids stored under `namespace`, or None (everything) when no namespace is given."""
+        if namespace is None:
+            return None
+        with self._lock:
+            return list(self._namespaces.get(namespace, ()))
+
+    def evict(self) -> int:
+        """Remove expired chunks, then least recently used ones over the limit."""
+        with self._lock:
+            expired = []
+            if self.ttl_seconds is not None:
+                cutoff = time.time() - self.ttl_seconds
+                expired = [doc_id for doc_id, (_, added_at) in self._entries.items() if added_at < cutoff]
+            self.delete(expired)
+
+            overflow = len(self._entries) - self.max_chunks
+            lru = list(self._entries.keys())[:max(overflow, 0)]
+            self.delete(lru)
+
+            removed = len(expired) + len(lru)
+            self.evicted += removed
+            return removed
+
+    def similarity_search_with_score(self, query: str, k: int = 4, namespace: Optional[str] = None,
+                                     filter: Optional[Callable[[Document], bool]] = None,
+                                     **kwargs) -> List[Tuple[Document, float]]:
+        self.evict()
+        embedding = self.embedding.embed_query(query)
+        with self._lock:
+            if namespace is not None:
+                members = self._namespaces.get(namespace, set())
+                # Explicit ids (e.g. a lexical prefilter) narrow the namespace further
+                kwargs["ids"] = list(members) if kwargs.get("ids") is None else [i for i in kwargs["ids"] if i in members]
+            results = self.similarity_search_with_score_by_vector(embedding, k=k, filter=filter, **kwargs)
+            for doc, _ in results:
+                if doc.id in self._entries:
+                    self._entries.move_to_end(doc.id)
+        return results
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "chunks": len(self._entries),
+                "max_chunks": self.max_chunks,
+                "namespaces": {ns: len(ids) for ns, ids in self._namespaces.items()},
+                "evicted": self.evicted,
+                "approx_bytes": self.nbytes,
+            }
@@ -0,0 +1,94 @@
+import importlib
+import json
+import re
+import subprocess
+import sys
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+# Dependencies that are imported on first use rather than at startup
+HEAVY_MODULES = {
+    "extractors": ("bs4", "extruct", "newspaper", "trafilatura"),
+    "pdf": ("fitz",),
+    "ocr": ("PIL.Image", "pytesseract"),
+    "llm": ("langchain.chat_models", "langchain_openai"),
+}
+
+
+def import_times(modules: Iterable[str]) -> Dict[str, float]:
+    """Seconds taken to import each module in this process (0.0 if it was already loaded)."""
+    timings = {}
+    for name in modules:
+        start = time.perf_counter()
+        importlib.import_module(name)
+        timings[name] = round(time.perf_counter() - start, 4)
+    return timings
+
+
+def warm_up(groups: Iterable[str] = ("extractors",), background: bool = False):
+    """Import the heavy dependencies of `groups` now instead of on first use.
+
+    Lets a worker report ready right after the fast import and load the
+    rest while it waits for its first request (background=True returns the
+    thread), or pay for everything up front.
+    """
+    modules = [m for group in groups for m in HEAVY_MODULES[group]]
+    if not background:
+        return import_times(modules)
+    thread = threading.Thread(target=import_times, args=(modules,), name="factsift-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+def cold_import(module: str = "rag_engine.rag_engine", runs: int = 3, top: int = 10) -> dict:
+    """Import `module` in fresh interpreters and report its cold import time.
+
+    Returns the median wall time over `runs` and the slowest top-level
+    imports (cumulative seconds from `python -X importtime`) of the last run.
+    """
+    seconds, log = [], ""
+    for _ in range(runs):
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                              capture_output=True, text=True)
+        seconds.append(time.perf_counter() - start)
+        if proc.returncode != 0:
+            raise RuntimeError(f"Importing {module} failed:\n{proc.stderr[-2000:]}")
+        log = proc.stderr
+
+    # Lines look like "import time:   self_us |   cumulative_us | <indent>package"
+    cumulative: List[tuple] = []
+    for match in re.finditer(r"^import time:\s+\d+ \|\s+(\d+) \| ( *)(\S+)$", log, re.MULTILINE):
+        us, indent, name = match.groups()
+        if len(indent) <= 3:
+            cumulative.append((name.strip(), int(us) / 1e6))
+    cumulative.sort(key=lambda item: item[1], reverse=True)
+
+    seconds.sort()
+    return {
+        "module": module,
+        "seconds": round(seconds[len(seconds) // 2], 4),
+        "slowest_imports": [(name, round(s, 4)) for name, s in cumulative[:top]],
+    }
+
+
+def startup_report(groups: Optional[Iterable[str]] = None, runs: int = 3) -> dict:
+    """Cold import of the pipeline and the app's modules, plus the cost of each lazy group."""
+    report = {
+        "cold_import": [cold_import(m, runs=runs) for m in ("rag_engine.rag_engine", "rag_engine.pdf_registry")],
+        "lazy_groups": {},
+    }
+    for group in groups or HEAVY_MODULES:
+        proc = subprocess.run(
+            [sys.executable, "-c",
+             f"import json; from rag_engine.startup import warm_up; print(json.dumps(warm_up([{group!r}])))"],
+            capture_output=True, text=True,
+        )
+        if proc.returncode == 0:
+            timings = json.loads(proc.stdout.strip().splitlines()[-1])
+            report["lazy_groups"][group] = round(sum(timings.values()), 4)
+        else:
+            # e.g. an optional OCR dependency that is not installed here
+            report["lazy_groups"][group] = f"unavailable ({proc.stderr.strip().splitlines()[-1]})"
+    return report
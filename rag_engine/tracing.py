@@ -0,0 +1,124 @@
+import json
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Optional
+
+
+class QueryTrace:
+    """Per-query record of stage wall times and counters.
+
+    Stages are timed with `with trace.stage("name"):` or added directly
+    with `record_stage`. Counters cover things like bytes downloaded,
+    chunk counts, tokens and cache hits. Safe to update from worker threads.
+    """
+
+    def __init__(self, query: Optional[str] = None):
+        self.trace_id = uuid.uuid4().hex
+        self.query = query
+        self.started_at = datetime.now(timezone.utc).isoformat()
+        self._start = time.perf_counter()
+        self.stages = {}
+        self.counters = defaultdict(float)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.record_stage(name, time.perf_counter() - start)
+
+    def record_stage(self, name: str, seconds: float):
+        with self._lock:
+            entry = self.stages.setdefault(name, {"seconds": 0.0, "calls": 0})
+            entry["seconds"] += seconds
+            entry["calls"] += 1
+
+    def incr(self, name: str, value: float = 1):
+        with self._lock:
+            self.counters[name] += value
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._start
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "trace_id": self.trace_id,
+                "query": self.query,
+                "started_at": self.started_at,
+                "total_seconds": round(self.elapsed(), 4),
+                "stages": {name: {"seconds": round(v["seconds"], 4), "calls": v["calls"]}
+                           for name, v in self.stages.items()},
+                "counters": dict(self.counters),
+            }
+
+    def to_jsonl(self, path: str):
+        """Append this trace as one JSON line."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(self.to_dict()) + "\n")
+
+
+class PipelineMetrics:
+    """Process-wide totals across finished traces, exportable for Prometheus."""
+
+    def __init__(self, prefix: str = "factsift"):
+        self.prefix = prefix
+        self.queries = 0
+        self.stage_seconds = defaultdict(float)
+        self.stage_calls = defaultdict(int)
+        self.counters = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def observe(self, trace: QueryTrace):
+        data = trace.to_dict()
+        with self._lock:
+            self.queries += 1
+            for name, stage in data["stages"].items():
+                self.stage_seconds[name] += stage["seconds"]
+                self.stage_calls[name] += stage["calls"]
+            for name, value in data["counters"].items():
+                self.counters[name] += value
+
+    def prometheus(self) -> str:
+        """Render the totals in the Prometheus text exposition format."""
+        p = self.prefix
+        with self._lock:
+            lines = [
+                f"# TYPE {p}_queries_total counter",
+                f"{p}_queries_total {self.queries}",
+                f"# TYPE {p}_stage_seconds_total counter",
+            ]
+            lines += [f'{p}_stage_seconds_total{{stage="{name}"}} {value:.6f}'
+                      for name, value in sorted(self.stage_seconds.items())]
+            lines.append(f"# TYPE {p}_stage_calls_total counter")
+            lines += [f'{p}_stage_calls_total{{stage="{name}"}} {value}'
+                      for name, value in sorted(self.stage_calls.items())]
+            for name, value in sorted(self.counters.items()):
+                metric = f"{p}_{name.replace('.', '_')}_total"
+                lines += [f"# TYPE {metric} counter", f"{metric} {value:g}"]
+        return "\n".join(lines) + "\n"
+
+
+metrics = PipelineMetrics()
+
+# Set FACTSIFT_TRACE_FILE to append every query trace as JSON lines
+TRACE_FILE = os.getenv("FACTSIFT_TRACE_FILE")
+
+
+def finish_trace(trace: QueryTrace) -> dict:
+    """Aggregate a completed trace and export it if a trace file is configured."""
+    metrics.observe(trace)
+    if TRACE_FILE:
+        try:
+            trace.to_jsonl(TRACE_FILE)
+        except OSError as e:
+            print(f"⚠️ Could not write trace: {e}")
+    return trace.to_dict()
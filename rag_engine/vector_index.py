@@ -0,0 +1,340 @@
+import io
+import json
+import threading
+import uuid
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from rag_engine.chunking import Chunk, TextView
+from rag_engine.lexical_index import BM25Index
+
+
+def _normalize(vectors) -> np.ndarray:
+    matrix = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first."""
+    if k <= 0 or scores.size == 0:
+        return np.empty(0, dtype=np.int64)
+    if k >= scores.size:
+        return np.argsort(-scores, kind="stable")
+    idx = np.argpartition(-scores, k - 1)[:k]
+    return idx[np.argsort(-scores[idx], kind="stable")]
+
+
+class NumpyVectorStore(VectorStore):
+    """Vector store backed by one contiguous, L2-normalized embedding matrix.
+
+    Scores are cosine similarities, as with InMemoryVectorStore, but are
+    computed with a single matrix product and top-k is selected with
+    argpartition. Several queries can be scored in one product with
+    `similarity_search_batch`.
+
+    Chunks added with `add_chunks` are kept as views of their document's
+    text with metadata shared per document, not as copies.
+
+    With `lexical=True` a BM25 inverted index is kept in step with the rows
+    for `lexical_search_with_score`.
+
+    `dtype=np.float16` halves memory at the cost of an upcast per search.
+    With `approximate=True`, stores larger than `ivf_min_size` build an IVF
+    index (k-means coarse quantizer) and only the `n_probe` closest lists
+    are scanned.
+    """
+
+    def __init__(self, embedding: Embeddings, dtype=np.float32, approximate: bool = False,
+                 n_lists: Optional[int] = None, n_probe: int = 8, ivf_min_size: int = 4096, lexical: bool = False):
+        self.embedding = embedding
+        self.dtype = np.dtype(dtype)
+        self.approximate = approximate
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.ivf_min_size = ivf_min_size
+        self.lexical = BM25Index() if lexical else None
+
+        self._vectors = None
+        self._size = 0
+        self._ids: List[str] = []
+        self._texts: List[Union[str, TextView]] = []
+        self._metadatas: List[dict] = []
+        self._rows = {}
+        # (centroids, row lists, number of rows covered by the index)
+        self._ivf = None
+        self._lock = threading.RLock()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by vectors, texts and metadata."""
+        vector_bytes = self._vectors.nbytes if self._vectors is not None else 0
+        texts = sum(len(t) for t in self._texts if isinstance(t, str))
+        # Views of the same document share one string
+        texts += sum(len(base) for base in {id(t.base): t.base for t in self._texts if isinstance(t, TextView)}.values())
+        return vector_bytes + texts + 256 * self._size
+
+    # -- Writing ---------------------------------------------------------
+
+    def _reserve(self, rows: int, dim: int):
+        if self._vectors is None:
+            self._vectors = np.zeros((max(rows, 64), dim), dtype=self.dtype)
+        elif self._vectors.shape[1] != dim:
+            raise ValueError(f"Expected {self._vectors.shape[1]}-dimension vectors, got {dim}")
+        elif rows > len(self._vectors):
+            # Grow geometrically so appends stay amortized O(1)
+            grown = np.zeros((max(rows, 2 * len(self._vectors)), dim), dtype=self.dtype)
+            grown[:self._size] = self._vectors[:self._size]
+            self._vectors = grown
+
+    def add_vectors(self, vectors, texts: Sequence[str], metadatas: Optional[Sequence[dict]] = None,
+                    ids: Optional[Sequence[str]] = None) -> List[str]:
+        """Add precomputed embeddings without calling the embedding model."""
+        matrix = _normalize(vectors).astype(self.dtype, copy=False)
+        metadatas = list(metadatas) if metadatas is not None else [{} for _ in texts]
+        ids = [i or str(uuid.uuid4()) for i in ids] if ids else [str(uuid.uuid4()) for _ in texts]
+        if not (len(matrix) == len(texts) == len(metadatas) == len(ids)):
+            raise ValueError("vectors, texts, metadatas and ids must have the same length")
+        if not ids:
+            return []
+
+        with self._lock:
+            self._reserve(self._size + len(ids), matrix.shape[1])
+            for vector, text, metadata, doc_id in zip(matrix, texts, metadatas, ids):
+                row = self._rows.get(doc_id)
+                if row is None:
+                    row = self._size
+                    self._size += 1
+                    self._rows[doc_id] = row
+                    self._ids.append(doc_id)
+                    self._texts.append(text)
+                    self._metadatas.append(metadata)
+                else:
+                    self._texts[row] = text
+                    self._metadatas[row] = metadata
+                    # Overwritten rows may now sit in the wrong IVF list
+                    self._ivf = None
+                self._vectors[row] = vector
+                if self.lexical is not None:
+                    self.lexical.add(doc_id, str(text))
+        return list(ids)
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None,
+                  ids: Optional[List[str]] = None, **kwargs) -> List[str]:
+        texts = list(texts)
+        if not texts:
+            return []
+        vectors = self.embedding.embed_documents(texts)
+        return self.add_vectors(vectors, texts, metadatas=metadatas, ids=ids)
+
+    def add_chunks(self, chunks: Iterable[Chunk], chunk_id: Optional[Callable[[Chunk], str]] = None,
+                   batch_size: int = 64) -> List[str]:
+        """Embed and add chunks (see rag_engine.chunking), `batch_size` at a time.
+
+        `chunks` may be a lazy generator: each batch is embedded as soon as it
+        is full. `chunk_id` derives a stable id from a chunk.
+        """
+        ids, batch = [], []
+        for chunk in chunks:
+            batch.append(chunk)
+            if len(batch) >= batch_size:
+                ids += self._add_chunk_batch(batch, chunk_id)
+                batch = []
+        return ids + self._add_chunk_batch(batch, chunk_id)
+
+    def _add_chunk_batch(self, batch: List[Chunk], chunk_id: Optional[Callable[[Chunk], str]]) -> List[str]:
+        if not batch:
+            return []
+        vectors = self.embedding.embed_documents([chunk.page_content for chunk in batch])
+        return self.add_vectors(vectors, [chunk.view for chunk in batch], [chunk.metadata for chunk in batch],
+                                [chunk_id(chunk) for chunk in batch] if chunk_id else None)
+
+    def delete(self, ids: Optional[Sequence[str]] = None, **kwargs) -> None:
+        if not ids:
+            return
+        with self._lock:
+            for doc_id in ids:
+                row = self._rows.pop(doc_id, None)
+                if row is None:
+                    continue
+                if self.lexical is not None:
+                    self.lexical.remove(doc_id)
+                last = self._size - 1
+                if row != last:
+                    # Swap the last row into the hole to keep the matrix dense
+                    self._vectors[row] = self._vectors[last]
+                    self._ids[row] = self._ids[last]
+                    self._texts[row] = self._texts[last]
+                    self._metadatas[row] = self._metadatas[last]
+                    self._rows[self._ids[row]] = row
+                self._ids.pop()
+                self._texts.pop()
+                self._metadatas.pop()
+                self._size -= 1
+            self._ivf = None
+
+    # -- Reading ---------------------------------------------------------
+
+    def _document(self, row: int) -> Document:
+        text, metadata = self._texts[row], self._metadatas[row]
+        if isinstance(text, TextView):
+            # Chunk rows share their document's metadata; the offset lives on the view
+            text, metadata = str(text), {**metadata, "start_index": text.start}
+        return Document(id=self._ids[row], page_content=text, metadata=metadata)
+
+    def get_by_ids(self, ids: Sequence[str], /) -> List[Document]:
+        with self._lock:
+            return [self._document(self._rows[i]) for i in ids if i in self._rows]
+
+    def ids(self) -> List[str]:
+        with self._lock:
+            return list(self._ids)
+
+    def get_vectors(self, ids: Sequence[str]) -> np.ndarray:
+        """Normalized float32 embeddings for `ids`, in the same order."""
+        with self._lock:
+            rows = [self._rows[i] for i in ids]
+            return self._vectors[rows].astype(np.float32)
+
+    def _build_ivf(self):
+        data = self._vectors[:self._size].astype(np.float32)
+        n_lists = min(self.n_lists or max(1, int(np.sqrt(self._size))), self._size)
+        rng = np.random.default_rng(0)
+        centroids = data[rng.choice(self._size, n_lists, replace=False)]
+        for _ in range(10):
+            assignment = np.argmax(data @ centroids.T, axis=1)
+            for c in range(n_lists):
+                members = data[assignment == c]
+                if len(members):
+                    centroids[c] = _normalize(members.mean(axis=0))[0]
+        assignment = np.argmax(data @ centroids.T, axis=1)
+        lists = [np.flatnonzero(assignment == c) for c in range(n_lists)]
+        self._ivf = (centroids, lists, self._size)
+
+    def _candidate_rows(self, query: np.ndarray, rows: Optional[np.ndarray]) -> Optional[np.ndarray]:
+        """Rows worth scoring for one query; None means every row."""
+        if rows is not None or not self.approximate or self._size < self.ivf_min_size:
+            return rows
+        # Rebuild once a quarter of the rows were added after the last build
+        if self._ivf is None or self._size > 1.25 * self._ivf[2]:
+            self._build_ivf()
+        centroids, lists, covered = self._ivf
+        probe = _top_k(centroids @ query, self.n_probe)
+        tail = np.arange(covered, self._size)
+        return np.concatenate([lists[c] for c in probe] + [tail])
+
+    def _search_rows(self, query: np.ndarray, k: int, rows: Optional[np.ndarray],
+                     filter: Optional[Callable[[Document], bool]]) -> List[Tuple[Document, float]]:
+        rows = self._candidate_rows(query, rows)
+        matrix = self._vectors[:self._size] if rows is None else self._vectors[rows]
+        scores = matrix.astype(np.float32, copy=False) @ query
+        order = _top_k(scores, scores.size if filter else k)
+
+        results = []
+        for idx in order:
+            row = int(idx) if rows is None else int(rows[idx])
+            doc = self._document(row)
+            if filter is not None and not filter(doc):
+                continue
+            results.append((doc, float(scores[idx])))
+            if len(results) >= k:
+                break
+        return results
+
+    def _rows_for_ids(self, ids: Optional[Iterable[str]]) -> Optional[np.ndarray]:
+        if ids is None:
+            return None
+        return np.fromiter((self._rows[i] for i in ids if i in self._rows), dtype=np.int64)
+
+    def similarity_search_with_score_by_vector(self, embedding: List[float], k: int = 4,
+                                               filter: Optional[Callable[[Document], bool]] = None,
+                                               ids: Optional[Iterable[str]] = None,
+                                               **kwargs) -> List[Tuple[Document, float]]:
+        query = _normalize(embedding)[0]
+        with self._lock:
+            if not self._size:
+                return []
+            return self._search_rows(query, k, self._rows_for_ids(ids), filter)
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self.embedding.embed_query(query), k, **kwargs)
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k, **kwargs)]
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, **kwargs)]
+
+    def lexical_search_with_score(self, query: str, k: int = 4,
+                                  ids: Optional[Iterable[str]] = None) -> List[Tuple[Document, float]]:
+        """Best BM25 matches for `query`, optionally among `ids`; empty unless built with lexical=True."""
+        if self.lexical is None:
+            return []
+        hits = self.lexical.search(query, k, ids)
+        with self._lock:
+            return [(self._document(self._rows[i]), score) for i, score in hits if i in self._rows]
+
+    def similarity_search_batch(self, queries: Sequence[str], k: int = 4) -> List[List[Tuple[Document, float]]]:
+        """Score several queries against the store with one matrix product."""
+        if not queries:
+            return []
+        matrix_q = _normalize([self.embedding.embed_query(q) for q in queries])
+        with self._lock:
+            if not self._size:
+                return [[] for _ in queries]
+            if self.approximate and self._size >= self.ivf_min_size:
+                return [self._search_rows(q, k, None, None) for q in matrix_q]
+            scores = matrix_q @ self._vectors[:self._size].astype(np.float32, copy=False).T
+            return [
+                [(self._document(int(row)), float(row_scores[row])) for row in _top_k(row_scores, k)]
+                for row_scores in scores
+            ]
+
+    # -- Persistence -----------------------------------------------------
+
+    def dump(self, path: str, ids: Optional[Sequence[str]] = None) -> None:
+        """Write the index (or only the rows of `ids`) to `path`."""
+        with self._lock:
+            rows = list(range(self._size)) if ids is None else [self._rows[i] for i in ids if i in self._rows]
+            docs = [self._document(row) for row in rows]
+            records = json.dumps({"ids": [self._ids[row] for row in rows], "texts": [d.page_content for d in docs],
+                                  "metadatas": [d.metadata for d in docs]}, default=str)
+            vectors = self._vectors[rows] if self._vectors is not None else np.zeros((0, 0), self.dtype)
+            buffer = io.BytesIO()
+            np.savez(buffer, vectors=vectors, records=np.frombuffer(records.encode("utf-8"), dtype=np.uint8))
+        with open(path, "wb") as f:
+            f.write(buffer.getvalue())
+
+    @classmethod
+    def load(cls, path: str, embedding: Embeddings, **kwargs) -> "NumpyVectorStore":
+        store = cls(embedding, **kwargs)
+        store.merge(path)
+        return store
+
+    def merge(self, path: str) -> int:
+        """Add the rows of an index written by `dump`; rows with an existing id replace it."""
+        with np.load(path, allow_pickle=False) as data:
+            records = json.loads(data["records"].tobytes().decode("utf-8"))
+            vectors = data["vectors"]
+        if len(vectors):
+            self.add_vectors(vectors, records["texts"], records["metadatas"], records["ids"])
+        return len(vectors)
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None,
+                   ids: Optional[List[str]] = None, **kwargs) -> "NumpyVectorStore":
+        store = cls(embedding, **kwargs)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
@@ -0,0 +1,15 @@
+from rag_engine.quality_filtering import DomainCredibilityIndex
+
+
+def test_lookalike_domains_get_the_default():
+    index = DomainCredibilityIndex({"bbc.com": 1.0, "cnn.com": 1.0}, default=0.5)
+    assert index.score({"source": "https://www.bbc.com/news/1", "domain": "bbc"}) == 1.0
+    assert index.score({"source": "https://bbc.xyz/news/1", "domain": "bbc"}) == 0.5
+    assert index.score({"source": "https://cnn.io/world", "domain": "cnn"}) == 0.5
+
+
+def test_label_is_only_used_without_a_url():
+    index = DomainCredibilityIndex({"bbc.com": 1.0}, default=0.5)
+    assert index.score({"source": "notes.pdf", "domain": "bbc"}) == 1.0
+    assert index.score({"domain": "bbc"}) == 1.0
+    assert index.score({}) is None